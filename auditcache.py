@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+#
+#    pdfaudit is a pdf auditing tool for security and privacy
+#    Copyright (C) 2020  Joseph Heller, http://github.com/catch22eu/
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import os							# to detect a fork, see connect()
+import time							# for least recently used eviction
+import json							# the stored findings
+import sqlite3						# the cache itself, including locking between processes
+
+class AuditCache:
+# Persistent cache of audit results in a sqlite database. Entries are stored under a key that is made by the caller, like the SHA-256 of the document and the settings of the audit. When the stored results grow beyond maxsize bytes, the least recently used entries are evicted. The database can be shared by several processes; sqlite takes care of the locking, and every process opens its own connection when it first uses the cache. 
+# hits and misses count the lookups of this process, stats() returns the totals of the database. 
+
+	def __init__(self, path, maxsize=256*1024*1024):
+		self.path = path
+		self.maxsize = maxsize
+		self.hits = 0
+		self.misses = 0
+		self.connection = None
+		self.pid = None
+
+	def __getstate__(self):
+	# only the settings are passed to worker processes, not the connection
+		return {'path': self.path, 'maxsize': self.maxsize}
+
+	def __setstate__(self, state):
+		self.__init__(state['path'], state['maxsize'])
+
+	def connect(self):
+		if self.connection is None or self.pid != os.getpid(): # a connection can not be used after a fork
+			self.connection = sqlite3.connect(self.path, timeout=60, isolation_level=None)
+			self.pid = os.getpid()
+			self.connection.execute("PRAGMA journal_mode=WAL") # readers do not wait for writers
+			self.connection.execute("CREATE TABLE IF NOT EXISTS results (key TEXT PRIMARY KEY, value TEXT, size INTEGER, used REAL)")
+			self.connection.execute("CREATE INDEX IF NOT EXISTS resultsused ON results (used)")
+			self.connection.execute("CREATE TABLE IF NOT EXISTS stats (name TEXT PRIMARY KEY, value INTEGER)")
+			self.connection.execute("INSERT OR IGNORE INTO stats VALUES ('hits',0), ('misses',0), ('evictions',0), ('size',0)")
+		return self.connection
+
+	def get(self, key):
+	# Returns the stored value, or None
+		connection = self.connect()
+		row = connection.execute("SELECT value FROM results WHERE key=?", (key,)).fetchone()
+		with connection:
+			connection.execute("BEGIN IMMEDIATE")
+			if row is None:
+				self.misses += 1
+				connection.execute("UPDATE stats SET value=value+1 WHERE name='misses'")
+				return None
+			self.hits += 1
+			connection.execute("UPDATE stats SET value=value+1 WHERE name='hits'")
+			connection.execute("UPDATE results SET used=? WHERE key=?", (time.time(), key))
+		return json.loads(row[0])
+
+	def getfirst(self, keys):
+	# Returns the value of the first of the keys that is stored, or None. Unlike get(), this is not counted as a hit or miss. 
+		connection = self.connect()
+		for key in keys:
+			row = connection.execute("SELECT value FROM results WHERE key=?", (key,)).fetchone()
+			if row is not None:
+				with connection:
+					connection.execute("UPDATE results SET used=? WHERE key=?", (time.time(), key))
+				return json.loads(row[0])
+		return None
+
+	def put(self, key, value):
+	# Stores a value that can be converted to json, and evicts the least recently used entries if the cache is full
+		value = json.dumps(value)
+		size = len(key)+len(value)
+		if size > self.maxsize:
+			return
+		connection = self.connect()
+		with connection:
+			connection.execute("BEGIN IMMEDIATE")
+			if connection.execute("INSERT OR IGNORE INTO results VALUES (?,?,?,?)", (key, value, size, time.time())).rowcount:
+				connection.execute("UPDATE stats SET value=value+? WHERE name='size'", (size,))
+			total = connection.execute("SELECT value FROM stats WHERE name='size'").fetchone()[0]
+			if total > self.maxsize:
+				self.evict(connection, total)
+
+	def evict(self, connection, total):
+	# Deletes the least recently used entries until the cache is within maxsize again
+		evicted = 0
+		while total > self.maxsize:
+			oldest = connection.execute("SELECT key, size FROM results ORDER BY used LIMIT 64").fetchall()
+			if not oldest:
+				break
+			for key, size in oldest:
+				if total <= self.maxsize:
+					break
+				connection.execute("DELETE FROM results WHERE key=?", (key,))
+				total -= size
+				evicted += 1
+		connection.execute("UPDATE stats SET value=? WHERE name='size'", (total,))
+		connection.execute("UPDATE stats SET value=value+? WHERE name='evictions'", (evicted,))
+
+	def stats(self):
+	# Returns the totals of the database: hits, misses, evictions, number of entries and size in bytes
+		connection = self.connect()
+		stats = dict(connection.execute("SELECT name, value FROM stats").fetchall())
+		stats['entries'] = connection.execute("SELECT COUNT(*) FROM results").fetchone()[0]
+		return stats
+
+	def close(self):
+		if self.connection is not None and self.pid == os.getpid():
+			self.connection.close()
+		self.connection = None
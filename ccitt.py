@@ -90,252 +90,260 @@ class BitParser:
 class CCITTG4Parser(BitParser):
 
     MODE = [None, None]
-    BitParser.add(MODE, 0,   '1')
-    BitParser.add(MODE, +1,  '011')
-    BitParser.add(MODE, -1,  '010')
-    BitParser.add(MODE, 'h', '001')
-    BitParser.add(MODE, 'p', '0001')
-    BitParser.add(MODE, +2,  '000011')
-    BitParser.add(MODE, -2,  '000010')
-    BitParser.add(MODE, +3,  '0000011')
-    BitParser.add(MODE, -3,  '0000010')
-    BitParser.add(MODE, 'u', '0000001111')
-    BitParser.add(MODE, 'x1', '0000001000')
-    BitParser.add(MODE, 'x2', '0000001001')
-    BitParser.add(MODE, 'x3', '0000001010')
-    BitParser.add(MODE, 'x4', '0000001011')
-    BitParser.add(MODE, 'x5', '0000001100')
-    BitParser.add(MODE, 'x6', '0000001101')
-    BitParser.add(MODE, 'x7', '0000001110')
-    BitParser.add(MODE, 'e', '000000000001000000000001')
+    MODECODES = (
+        (0, '1'),
+        (+1, '011'),
+        (-1, '010'),
+        ('h', '001'),
+        ('p', '0001'),
+        (+2, '000011'),
+        (-2, '000010'),
+        (+3, '0000011'),
+        (-3, '0000010'),
+        ('u', '0000001111'),
+        ('x1', '0000001000'),
+        ('x2', '0000001001'),
+        ('x3', '0000001010'),
+        ('x4', '0000001011'),
+        ('x5', '0000001100'),
+        ('x6', '0000001101'),
+        ('x7', '0000001110'),
+        ('e', '000000000001000000000001'),
+    )
 
     WHITE = [None, None]
-    BitParser.add(WHITE, 0   , '00110101')
-    BitParser.add(WHITE, 1   , '000111')
-    BitParser.add(WHITE, 2   , '0111')
-    BitParser.add(WHITE, 3   , '1000')
-    BitParser.add(WHITE, 4   , '1011')
-    BitParser.add(WHITE, 5   , '1100')
-    BitParser.add(WHITE, 6   , '1110')
-    BitParser.add(WHITE, 7   , '1111')
-    BitParser.add(WHITE, 8   , '10011')
-    BitParser.add(WHITE, 9   , '10100')
-    BitParser.add(WHITE, 10  , '00111')
-    BitParser.add(WHITE, 11  , '01000')
-    BitParser.add(WHITE, 12  , '001000')
-    BitParser.add(WHITE, 13  , '000011')
-    BitParser.add(WHITE, 14  , '110100')
-    BitParser.add(WHITE, 15  , '110101')
-    BitParser.add(WHITE, 16  , '101010')
-    BitParser.add(WHITE, 17  , '101011')
-    BitParser.add(WHITE, 18  , '0100111')
-    BitParser.add(WHITE, 19  , '0001100')
-    BitParser.add(WHITE, 20  , '0001000')
-    BitParser.add(WHITE, 21  , '0010111')
-    BitParser.add(WHITE, 22  , '0000011')
-    BitParser.add(WHITE, 23  , '0000100')
-    BitParser.add(WHITE, 24  , '0101000')
-    BitParser.add(WHITE, 25  , '0101011')
-    BitParser.add(WHITE, 26  , '0010011')
-    BitParser.add(WHITE, 27  , '0100100')
-    BitParser.add(WHITE, 28  , '0011000')
-    BitParser.add(WHITE, 29  , '00000010')
-    BitParser.add(WHITE, 30  , '00000011')
-    BitParser.add(WHITE, 31  , '00011010')
-    BitParser.add(WHITE, 32  , '00011011')
-    BitParser.add(WHITE, 33  , '00010010')
-    BitParser.add(WHITE, 34  , '00010011')
-    BitParser.add(WHITE, 35  , '00010100')
-    BitParser.add(WHITE, 36  , '00010101')
-    BitParser.add(WHITE, 37  , '00010110')
-    BitParser.add(WHITE, 38  , '00010111')
-    BitParser.add(WHITE, 39  , '00101000')
-    BitParser.add(WHITE, 40  , '00101001')
-    BitParser.add(WHITE, 41  , '00101010')
-    BitParser.add(WHITE, 42  , '00101011')
-    BitParser.add(WHITE, 43  , '00101100')
-    BitParser.add(WHITE, 44  , '00101101')
-    BitParser.add(WHITE, 45  , '00000100')
-    BitParser.add(WHITE, 46  , '00000101')
-    BitParser.add(WHITE, 47  , '00001010')
-    BitParser.add(WHITE, 48  , '00001011')
-    BitParser.add(WHITE, 49  , '01010010')
-    BitParser.add(WHITE, 50  , '01010011')
-    BitParser.add(WHITE, 51  , '01010100')
-    BitParser.add(WHITE, 52  , '01010101')
-    BitParser.add(WHITE, 53  , '00100100')
-    BitParser.add(WHITE, 54  , '00100101')
-    BitParser.add(WHITE, 55  , '01011000')
-    BitParser.add(WHITE, 56  , '01011001')
-    BitParser.add(WHITE, 57  , '01011010')
-    BitParser.add(WHITE, 58  , '01011011')
-    BitParser.add(WHITE, 59  , '01001010')
-    BitParser.add(WHITE, 60  , '01001011')
-    BitParser.add(WHITE, 61  , '00110010')
-    BitParser.add(WHITE, 62  , '00110011')
-    BitParser.add(WHITE, 63  , '00110100')
-    BitParser.add(WHITE, 64  , '11011')
-    BitParser.add(WHITE, 128 , '10010')
-    BitParser.add(WHITE, 192 , '010111')
-    BitParser.add(WHITE, 256 , '0110111')
-    BitParser.add(WHITE, 320 , '00110110')
-    BitParser.add(WHITE, 384 , '00110111')
-    BitParser.add(WHITE, 448 , '01100100')
-    BitParser.add(WHITE, 512 , '01100101')
-    BitParser.add(WHITE, 576 , '01101000')
-    BitParser.add(WHITE, 640 , '01100111')
-    BitParser.add(WHITE, 704 , '011001100')
-    BitParser.add(WHITE, 768 , '011001101')
-    BitParser.add(WHITE, 832 , '011010010')
-    BitParser.add(WHITE, 896 , '011010011')
-    BitParser.add(WHITE, 960 , '011010100')
-    BitParser.add(WHITE, 1024, '011010101')
-    BitParser.add(WHITE, 1088, '011010110')
-    BitParser.add(WHITE, 1152, '011010111')
-    BitParser.add(WHITE, 1216, '011011000')
-    BitParser.add(WHITE, 1280, '011011001')
-    BitParser.add(WHITE, 1344, '011011010')
-    BitParser.add(WHITE, 1408, '011011011')
-    BitParser.add(WHITE, 1472, '010011000')
-    BitParser.add(WHITE, 1536, '010011001')
-    BitParser.add(WHITE, 1600, '010011010')
-    BitParser.add(WHITE, 1664, '011000')
-    BitParser.add(WHITE, 1728, '010011011')
-    BitParser.add(WHITE, 1792, '00000001000')
-    BitParser.add(WHITE, 1856, '00000001100')
-    BitParser.add(WHITE, 1920, '00000001101')
-    BitParser.add(WHITE, 1984, '000000010010')
-    BitParser.add(WHITE, 2048, '000000010011')
-    BitParser.add(WHITE, 2112, '000000010100')
-    BitParser.add(WHITE, 2176, '000000010101')
-    BitParser.add(WHITE, 2240, '000000010110')
-    BitParser.add(WHITE, 2304, '000000010111')
-    BitParser.add(WHITE, 2368, '000000011100')
-    BitParser.add(WHITE, 2432, '000000011101')
-    BitParser.add(WHITE, 2496, '000000011110')
-    BitParser.add(WHITE, 2560, '000000011111')
+    WHITECODES = (
+        (0, '00110101'),
+        (1, '000111'),
+        (2, '0111'),
+        (3, '1000'),
+        (4, '1011'),
+        (5, '1100'),
+        (6, '1110'),
+        (7, '1111'),
+        (8, '10011'),
+        (9, '10100'),
+        (10, '00111'),
+        (11, '01000'),
+        (12, '001000'),
+        (13, '000011'),
+        (14, '110100'),
+        (15, '110101'),
+        (16, '101010'),
+        (17, '101011'),
+        (18, '0100111'),
+        (19, '0001100'),
+        (20, '0001000'),
+        (21, '0010111'),
+        (22, '0000011'),
+        (23, '0000100'),
+        (24, '0101000'),
+        (25, '0101011'),
+        (26, '0010011'),
+        (27, '0100100'),
+        (28, '0011000'),
+        (29, '00000010'),
+        (30, '00000011'),
+        (31, '00011010'),
+        (32, '00011011'),
+        (33, '00010010'),
+        (34, '00010011'),
+        (35, '00010100'),
+        (36, '00010101'),
+        (37, '00010110'),
+        (38, '00010111'),
+        (39, '00101000'),
+        (40, '00101001'),
+        (41, '00101010'),
+        (42, '00101011'),
+        (43, '00101100'),
+        (44, '00101101'),
+        (45, '00000100'),
+        (46, '00000101'),
+        (47, '00001010'),
+        (48, '00001011'),
+        (49, '01010010'),
+        (50, '01010011'),
+        (51, '01010100'),
+        (52, '01010101'),
+        (53, '00100100'),
+        (54, '00100101'),
+        (55, '01011000'),
+        (56, '01011001'),
+        (57, '01011010'),
+        (58, '01011011'),
+        (59, '01001010'),
+        (60, '01001011'),
+        (61, '00110010'),
+        (62, '00110011'),
+        (63, '00110100'),
+        (64, '11011'),
+        (128, '10010'),
+        (192, '010111'),
+        (256, '0110111'),
+        (320, '00110110'),
+        (384, '00110111'),
+        (448, '01100100'),
+        (512, '01100101'),
+        (576, '01101000'),
+        (640, '01100111'),
+        (704, '011001100'),
+        (768, '011001101'),
+        (832, '011010010'),
+        (896, '011010011'),
+        (960, '011010100'),
+        (1024, '011010101'),
+        (1088, '011010110'),
+        (1152, '011010111'),
+        (1216, '011011000'),
+        (1280, '011011001'),
+        (1344, '011011010'),
+        (1408, '011011011'),
+        (1472, '010011000'),
+        (1536, '010011001'),
+        (1600, '010011010'),
+        (1664, '011000'),
+        (1728, '010011011'),
+        (1792, '00000001000'),
+        (1856, '00000001100'),
+        (1920, '00000001101'),
+        (1984, '000000010010'),
+        (2048, '000000010011'),
+        (2112, '000000010100'),
+        (2176, '000000010101'),
+        (2240, '000000010110'),
+        (2304, '000000010111'),
+        (2368, '000000011100'),
+        (2432, '000000011101'),
+        (2496, '000000011110'),
+        (2560, '000000011111'),
+    )
 
     BLACK = [None, None]
-    BitParser.add(BLACK, 0   , '0000110111')
-    BitParser.add(BLACK, 1   , '010')
-    BitParser.add(BLACK, 2   , '11')
-    BitParser.add(BLACK, 3   , '10')
-    BitParser.add(BLACK, 4   , '011')
-    BitParser.add(BLACK, 5   , '0011')
-    BitParser.add(BLACK, 6   , '0010')
-    BitParser.add(BLACK, 7   , '00011')
-    BitParser.add(BLACK, 8   , '000101')
-    BitParser.add(BLACK, 9   , '000100')
-    BitParser.add(BLACK, 10  , '0000100')
-    BitParser.add(BLACK, 11  , '0000101')
-    BitParser.add(BLACK, 12  , '0000111')
-    BitParser.add(BLACK, 13  , '00000100')
-    BitParser.add(BLACK, 14  , '00000111')
-    BitParser.add(BLACK, 15  , '000011000')
-    BitParser.add(BLACK, 16  , '0000010111')
-    BitParser.add(BLACK, 17  , '0000011000')
-    BitParser.add(BLACK, 18  , '0000001000')
-    BitParser.add(BLACK, 19  , '00001100111')
-    BitParser.add(BLACK, 20  , '00001101000')
-    BitParser.add(BLACK, 21  , '00001101100')
-    BitParser.add(BLACK, 22  , '00000110111')
-    BitParser.add(BLACK, 23  , '00000101000')
-    BitParser.add(BLACK, 24  , '00000010111')
-    BitParser.add(BLACK, 25  , '00000011000')
-    BitParser.add(BLACK, 26  , '000011001010')
-    BitParser.add(BLACK, 27  , '000011001011')
-    BitParser.add(BLACK, 28  , '000011001100')
-    BitParser.add(BLACK, 29  , '000011001101')
-    BitParser.add(BLACK, 30  , '000001101000')
-    BitParser.add(BLACK, 31  , '000001101001')
-    BitParser.add(BLACK, 32  , '000001101010')
-    BitParser.add(BLACK, 33  , '000001101011')
-    BitParser.add(BLACK, 34  , '000011010010')
-    BitParser.add(BLACK, 35  , '000011010011')
-    BitParser.add(BLACK, 36  , '000011010100')
-    BitParser.add(BLACK, 37  , '000011010101')
-    BitParser.add(BLACK, 38  , '000011010110')
-    BitParser.add(BLACK, 39  , '000011010111')
-    BitParser.add(BLACK, 40  , '000001101100')
-    BitParser.add(BLACK, 41  , '000001101101')
-    BitParser.add(BLACK, 42  , '000011011010')
-    BitParser.add(BLACK, 43  , '000011011011')
-    BitParser.add(BLACK, 44  , '000001010100')
-    BitParser.add(BLACK, 45  , '000001010101')
-    BitParser.add(BLACK, 46  , '000001010110')
-    BitParser.add(BLACK, 47  , '000001010111')
-    BitParser.add(BLACK, 48  , '000001100100')
-    BitParser.add(BLACK, 49  , '000001100101')
-    BitParser.add(BLACK, 50  , '000001010010')
-    BitParser.add(BLACK, 51  , '000001010011')
-    BitParser.add(BLACK, 52  , '000000100100')
-    BitParser.add(BLACK, 53  , '000000110111')
-    BitParser.add(BLACK, 54  , '000000111000')
-    BitParser.add(BLACK, 55  , '000000100111')
-    BitParser.add(BLACK, 56  , '000000101000')
-    BitParser.add(BLACK, 57  , '000001011000')
-    BitParser.add(BLACK, 58  , '000001011001')
-    BitParser.add(BLACK, 59  , '000000101011')
-    BitParser.add(BLACK, 60  , '000000101100')
-    BitParser.add(BLACK, 61  , '000001011010')
-    BitParser.add(BLACK, 62  , '000001100110')
-    BitParser.add(BLACK, 63  , '000001100111')
-    BitParser.add(BLACK, 64  , '0000001111')
-    BitParser.add(BLACK, 128 , '000011001000')
-    BitParser.add(BLACK, 192 , '000011001001')
-    BitParser.add(BLACK, 256 , '000001011011')
-    BitParser.add(BLACK, 320 , '000000110011')
-    BitParser.add(BLACK, 384 , '000000110100')
-    BitParser.add(BLACK, 448 , '000000110101')
-    BitParser.add(BLACK, 512 , '0000001101100')
-    BitParser.add(BLACK, 576 , '0000001101101')
-    BitParser.add(BLACK, 640 , '0000001001010')
-    BitParser.add(BLACK, 704 , '0000001001011')
-    BitParser.add(BLACK, 768 , '0000001001100')
-    BitParser.add(BLACK, 832 , '0000001001101')
-    BitParser.add(BLACK, 896 , '0000001110010')
-    BitParser.add(BLACK, 960 , '0000001110011')
-    BitParser.add(BLACK, 1024, '0000001110100')
-    BitParser.add(BLACK, 1088, '0000001110101')
-    BitParser.add(BLACK, 1152, '0000001110110')
-    BitParser.add(BLACK, 1216, '0000001110111')
-    BitParser.add(BLACK, 1280, '0000001010010')
-    BitParser.add(BLACK, 1344, '0000001010011')
-    BitParser.add(BLACK, 1408, '0000001010100')
-    BitParser.add(BLACK, 1472, '0000001010101')
-    BitParser.add(BLACK, 1536, '0000001011010')
-    BitParser.add(BLACK, 1600, '0000001011011')
-    BitParser.add(BLACK, 1664, '0000001100100')
-    BitParser.add(BLACK, 1728, '0000001100101')
-    BitParser.add(BLACK, 1792, '00000001000')
-    BitParser.add(BLACK, 1856, '00000001100')
-    BitParser.add(BLACK, 1920, '00000001101')
-    BitParser.add(BLACK, 1984, '000000010010')
-    BitParser.add(BLACK, 2048, '000000010011')
-    BitParser.add(BLACK, 2112, '000000010100')
-    BitParser.add(BLACK, 2176, '000000010101')
-    BitParser.add(BLACK, 2240, '000000010110')
-    BitParser.add(BLACK, 2304, '000000010111')
-    BitParser.add(BLACK, 2368, '000000011100')
-    BitParser.add(BLACK, 2432, '000000011101')
-    BitParser.add(BLACK, 2496, '000000011110')
-    BitParser.add(BLACK, 2560, '000000011111')
+    BLACKCODES = (
+        (0, '0000110111'),
+        (1, '010'),
+        (2, '11'),
+        (3, '10'),
+        (4, '011'),
+        (5, '0011'),
+        (6, '0010'),
+        (7, '00011'),
+        (8, '000101'),
+        (9, '000100'),
+        (10, '0000100'),
+        (11, '0000101'),
+        (12, '0000111'),
+        (13, '00000100'),
+        (14, '00000111'),
+        (15, '000011000'),
+        (16, '0000010111'),
+        (17, '0000011000'),
+        (18, '0000001000'),
+        (19, '00001100111'),
+        (20, '00001101000'),
+        (21, '00001101100'),
+        (22, '00000110111'),
+        (23, '00000101000'),
+        (24, '00000010111'),
+        (25, '00000011000'),
+        (26, '000011001010'),
+        (27, '000011001011'),
+        (28, '000011001100'),
+        (29, '000011001101'),
+        (30, '000001101000'),
+        (31, '000001101001'),
+        (32, '000001101010'),
+        (33, '000001101011'),
+        (34, '000011010010'),
+        (35, '000011010011'),
+        (36, '000011010100'),
+        (37, '000011010101'),
+        (38, '000011010110'),
+        (39, '000011010111'),
+        (40, '000001101100'),
+        (41, '000001101101'),
+        (42, '000011011010'),
+        (43, '000011011011'),
+        (44, '000001010100'),
+        (45, '000001010101'),
+        (46, '000001010110'),
+        (47, '000001010111'),
+        (48, '000001100100'),
+        (49, '000001100101'),
+        (50, '000001010010'),
+        (51, '000001010011'),
+        (52, '000000100100'),
+        (53, '000000110111'),
+        (54, '000000111000'),
+        (55, '000000100111'),
+        (56, '000000101000'),
+        (57, '000001011000'),
+        (58, '000001011001'),
+        (59, '000000101011'),
+        (60, '000000101100'),
+        (61, '000001011010'),
+        (62, '000001100110'),
+        (63, '000001100111'),
+        (64, '0000001111'),
+        (128, '000011001000'),
+        (192, '000011001001'),
+        (256, '000001011011'),
+        (320, '000000110011'),
+        (384, '000000110100'),
+        (448, '000000110101'),
+        (512, '0000001101100'),
+        (576, '0000001101101'),
+        (640, '0000001001010'),
+        (704, '0000001001011'),
+        (768, '0000001001100'),
+        (832, '0000001001101'),
+        (896, '0000001110010'),
+        (960, '0000001110011'),
+        (1024, '0000001110100'),
+        (1088, '0000001110101'),
+        (1152, '0000001110110'),
+        (1216, '0000001110111'),
+        (1280, '0000001010010'),
+        (1344, '0000001010011'),
+        (1408, '0000001010100'),
+        (1472, '0000001010101'),
+        (1536, '0000001011010'),
+        (1600, '0000001011011'),
+        (1664, '0000001100100'),
+        (1728, '0000001100101'),
+        (1792, '00000001000'),
+        (1856, '00000001100'),
+        (1920, '00000001101'),
+        (1984, '000000010010'),
+        (2048, '000000010011'),
+        (2112, '000000010100'),
+        (2176, '000000010101'),
+        (2240, '000000010110'),
+        (2304, '000000010111'),
+        (2368, '000000011100'),
+        (2432, '000000011101'),
+        (2496, '000000011110'),
+        (2560, '000000011111'),
+    )
 
     UNCOMPRESSED = [None, None]
-    BitParser.add(UNCOMPRESSED, '1', '1')
-    BitParser.add(UNCOMPRESSED, '01', '01')
-    BitParser.add(UNCOMPRESSED, '001', '001')
-    BitParser.add(UNCOMPRESSED, '0001', '0001')
-    BitParser.add(UNCOMPRESSED, '00001', '00001')
-    BitParser.add(UNCOMPRESSED, '00000', '000001')
-    BitParser.add(UNCOMPRESSED, 'T00', '00000011')
-    BitParser.add(UNCOMPRESSED, 'T10', '00000010')
-    BitParser.add(UNCOMPRESSED, 'T000', '000000011')
-    BitParser.add(UNCOMPRESSED, 'T100', '000000010')
-    BitParser.add(UNCOMPRESSED, 'T0000', '0000000011')
-    BitParser.add(UNCOMPRESSED, 'T1000', '0000000010')
-    BitParser.add(UNCOMPRESSED, 'T00000', '00000000011')
-    BitParser.add(UNCOMPRESSED, 'T10000', '00000000010')
+    UNCOMPRESSEDCODES = (
+        ('1', '1'),
+        ('01', '01'),
+        ('001', '001'),
+        ('0001', '0001'),
+        ('00001', '00001'),
+        ('00000', '000001'),
+        ('T00', '00000011'),
+        ('T10', '00000010'),
+        ('T000', '000000011'),
+        ('T100', '000000010'),
+        ('T0000', '0000000011'),
+        ('T1000', '0000000010'),
+        ('T00000', '00000000011'),
+        ('T10000', '00000000010'),
+    )
 
     class EOFB(Exception):
         pass
@@ -346,7 +354,24 @@ class CCITTG4Parser(BitParser):
     class ByteSkip(Exception):
         pass
 
+    # The code trees are built from the code tables when the first parser
+    # is created, so importing this module does not cost any time.
+    _built = False
+
+    @classmethod
+    def _build_trees(klass):
+        for (root, codes) in ((klass.MODE, klass.MODECODES),
+                              (klass.WHITE, klass.WHITECODES),
+                              (klass.BLACK, klass.BLACKCODES),
+                              (klass.UNCOMPRESSED, klass.UNCOMPRESSEDCODES)):
+            for (v, bits) in codes:
+                BitParser.add(root, v, bits)
+        CCITTG4Parser._built = True
+        return
+
     def __init__(self, width, bytealign=False):
+        if not self._built:
+            self._build_trees()
         BitParser.__init__(self)
         self.width = width
         self.bytealign = bytealign
@@ -552,164 +577,6 @@ class CCITTG4Parser(BitParser):
             self._flush_line()
         return
 
-import unittest
-
-
-##  Test cases
-##
-class TestCCITTG4Parser(unittest.TestCase):
-
-    def get_parser(self, bits):
-        parser = CCITTG4Parser(len(bits))
-        parser._curline = [int(c) for c in bits]
-        parser._reset_line()
-        return parser
-
-    def test_b1(self):
-        parser = self.get_parser('00000')
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 0)
-        return
-
-    def test_b2(self):
-        parser = self.get_parser('10000')
-        parser._do_vertical(-1)
-        self.assertEqual(parser._curpos, 0)
-        return
-
-    def test_b3(self):
-        parser = self.get_parser('000111')
-        parser._do_pass()
-        self.assertEqual(parser._curpos, 3)
-        self.assertEqual(parser._get_bits(), '111')
-        return
-
-    def test_b4(self):
-        parser = self.get_parser('00000')
-        parser._do_vertical(+2)
-        self.assertEqual(parser._curpos, 2)
-        self.assertEqual(parser._get_bits(), '11')
-        return
-
-    def test_b5(self):
-        parser = self.get_parser('11111111100')
-        parser._do_horizontal(0, 3)
-        self.assertEqual(parser._curpos, 3)
-        parser._do_vertical(1)
-        self.assertEqual(parser._curpos, 10)
-        self.assertEqual(parser._get_bits(), '0001111111')
-        return
-
-    def test_e1(self):
-        parser = self.get_parser('10000')
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 1)
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 5)
-        self.assertEqual(parser._get_bits(), '10000')
-        return
-
-    def test_e2(self):
-        parser = self.get_parser('10011')
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 1)
-        parser._do_vertical(2)
-        self.assertEqual(parser._curpos, 5)
-        self.assertEqual(parser._get_bits(), '10000')
-        return
-
-    def test_e3(self):
-        parser = self.get_parser('011111')
-        parser._color = 0
-        parser._do_vertical(0)
-        self.assertEqual(parser._color, 1)
-        self.assertEqual(parser._curpos, 1)
-        parser._do_vertical(-2)
-        self.assertEqual(parser._color, 0)
-        self.assertEqual(parser._curpos, 4)
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 6)
-        self.assertEqual(parser._get_bits(), '011100')
-        return
-
-    def test_e4(self):
-        parser = self.get_parser('10000')
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 1)
-        parser._do_vertical(-2)
-        self.assertEqual(parser._curpos, 3)
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 5)
-        self.assertEqual(parser._get_bits(), '10011')
-        return
-
-    def test_e5(self):
-        parser = self.get_parser('011000')
-        parser._color = 0
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 1)
-        parser._do_vertical(3)
-        self.assertEqual(parser._curpos, 6)
-        self.assertEqual(parser._get_bits(), '011111')
-        return
-
-    def test_e6(self):
-        parser = self.get_parser('11001')
-        parser._do_pass()
-        self.assertEqual(parser._curpos, 4)
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 5)
-        self.assertEqual(parser._get_bits(), '11111')
-        return
-
-    def test_e7(self):
-        parser = self.get_parser('0000000000')
-        parser._curpos = 2
-        parser._color = 1
-        parser._do_horizontal(2, 6)
-        self.assertEqual(parser._curpos, 10)
-        self.assertEqual(parser._get_bits(), '1111000000')
-        return
-
-    def test_e8(self):
-        parser = self.get_parser('001100000')
-        parser._curpos = 1
-        parser._color = 0
-        parser._do_vertical(0)
-        self.assertEqual(parser._curpos, 2)
-        parser._do_horizontal(7, 0)
-        self.assertEqual(parser._curpos, 9)
-        self.assertEqual(parser._get_bits(), '101111111')
-        return
-
-    def test_m1(self):
-        parser = self.get_parser('10101')
-        parser._do_pass()
-        self.assertEqual(parser._curpos, 2)
-        parser._do_pass()
-        self.assertEqual(parser._curpos, 4)
-        self.assertEqual(parser._get_bits(), '1111')
-        return
-
-    def test_m2(self):
-        parser = self.get_parser('101011')
-        parser._do_vertical(-1)
-        parser._do_vertical(-1)
-        parser._do_vertical(1)
-        parser._do_horizontal(1, 1)
-        self.assertEqual(parser._get_bits(), '011101')
-        return
-
-    def test_m3(self):
-        parser = self.get_parser('10111011')
-        parser._do_vertical(-1)
-        parser._do_pass()
-        parser._do_vertical(1)
-        parser._do_vertical(1)
-        self.assertEqual(parser._get_bits(), '00000001')
-        return
-
-
 ##  CCITTFaxDecoder
 ##
 class CCITTFaxDecoder(CCITTG4Parser):
@@ -750,7 +617,8 @@ def ccittfaxdecode(data, params):
 # test
 def main(argv):
     if not argv[1:]:
-        return unittest.main()
+        import unittest
+        return unittest.main(module='test_ccitt')
 
     class Parser(CCITTG4Parser):
 
@@ -781,4 +649,5 @@ def main(argv):
             parser.close()
     return
 
-if __name__ == '__main__': sys.exit(main(sys.argv))
+if __name__ == '__main__':
+    sys.exit(main(sys.argv))
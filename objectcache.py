@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+#
+#    pdfaudit is a pdf auditing tool for security and privacy
+#    Copyright (C) 2020  Joseph Heller, http://github.com/catch22eu/
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+from collections import OrderedDict	# entries in least recently used order
+
+class ObjectCache:
+# The parsed objects of a document by (object number, generation), used like a dict. With a budget (in bytes), the least recently used objects are evicted when the estimated size of all objects exceeds it; onevict(key, value) is called for each, so the caller can read the object again when it is needed. Without a budget the cache is not bounded, and sizes are not estimated. 
+# hits counts the lookups of objects in the cache, misses the objects that were stored again after they were evicted (read again), and evictions the evicted objects. 
+
+	def __init__(self, budget=0, onevict=None):
+		self.budget = budget
+		self.onevict = onevict
+		self.clear()
+
+	def clear(self):
+		self.entries = OrderedDict()
+		self.sizes = {}
+		self.size = 0
+		self.peak = 0
+		self.evicted = set() # evicted objects that were not stored again
+		self.hits = 0
+		self.misses = 0
+		self.evictions = 0
+
+	def __len__(self):
+		return len(self.entries)
+
+	def __contains__(self, key):
+		return key in self.entries
+
+	def __iter__(self):
+		return iter(list(self.entries))
+
+	def keys(self):
+		return self.entries.keys()
+
+	def get(self, key, default=None):
+		if key not in self.entries:
+			return default
+		self.hits += 1
+		self.entries.move_to_end(key)
+		return self.entries[key]
+
+	def __getitem__(self, key):
+		if key not in self.entries:
+			raise KeyError(key)
+		return self.get(key)
+
+	def __setitem__(self, key, value):
+		if key in self.evicted:
+			self.evicted.discard(key)
+			self.misses += 1
+		self.entries[key] = value
+		self.entries.move_to_end(key)
+		self.resize(key)
+
+	def pop(self, key, default=None):
+		self.evicted.discard(key)
+		if key not in self.entries:
+			return default
+		self.size -= self.sizes.pop(key, 0)
+		return self.entries.pop(key)
+
+	def resize(self, key):
+	# estimates the size of an object again, like after its stream was decoded
+		if not self.budget or key not in self.entries:
+			return
+		size = objectsize(self.entries[key])
+		self.size += size - self.sizes.get(key, 0)
+		self.sizes[key] = size
+		self.peak = max(self.peak, self.size)
+		self.evict()
+
+	def evict(self):
+	# evicts the least recently used objects until the cache fits in the budget; the most recent one is kept in any case
+		while self.size > self.budget and len(self.entries) > 1:
+			key, value = self.entries.popitem(last=False)
+			self.size -= self.sizes.pop(key, 0)
+			self.evicted.add(key)
+			self.evictions += 1
+			if self.onevict is not None:
+				self.onevict(key, value)
+
+def objectsize(value):
+# Estimated memory used by a parsed object in bytes: the python objects of its dictionaries, arrays and strings, and the data held by other objects that have a footprint() method, like a stream handle. Nested objects are followed with a stack instead of recursion, as these can be nested very deep. 
+	size = 0
+	stack = [value]
+	while stack:
+		value = stack.pop()
+		if isinstance(value, str):
+			size += 49 + len(value)
+		elif isinstance(value, dict):
+			size += 64 + 24*len(value)
+			stack.extend(value.keys())
+			stack.extend(value.values())
+		elif isinstance(value, (list, tuple)):
+			size += 56 + 8*len(value)
+			stack.extend(value)
+		elif hasattr(value, 'footprint'):
+			size += value.footprint()
+		else:
+			size += 32
+	return size
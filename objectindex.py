@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+#
+#    pdfaudit is a pdf auditing tool for security and privacy
+#    Copyright (C) 2020  Joseph Heller, http://github.com/catch22eu/
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+from array import array				# columns of the index
+
+def fits(number, generation):
+# whether an object number and generation can be stored in the 'q' and 'i' columns
+	return -0x8000000000000000 <= number < 0x8000000000000000 and -0x80000000 <= generation < 0x80000000
+
+class ObjectIndex:
+# Location of each object of a document by (object number, generation): its offset in the document, or for an index of compressed objects (containers=True), the object stream it is in and its offset in the decoded object stream. It is used like a dict: index[key] = value, index.get(key), key in index, and iterating gives the keys in the order they were first added. Setting a key again (a later revision of the object) replaces its value, but keeps its place. 
+# The index is stored in columns of arrays instead of a dict with tuple keys (well over 100 bytes per object). Per object these are 8 bytes for the number, 4 for the generation, 8 for the offset and 8 for the next object with the same number, plus 12 for the object stream with containers. An object is looked up by its number in a table of 8 bytes per object number, up to the highest number, which is usually about the number of objects: around 36 bytes per object in total, 48 with containers. Numbers that are far beyond the number of objects (malformed documents) are looked up in a dict instead, so the table does not grow on them. Keys or containers that do not fit in the columns at all are kept in dicts as well, in their row (which is otherwise unused). 
+
+	def __init__(self, containers=False):
+		self.containers = containers
+		self.clear()
+
+	def clear(self):
+		self.numbers = array('q')
+		self.generations = array('i')
+		self.offsets = array('q')
+		self.chain = array('q') # next row with the same object number, or -1
+		self.containernumbers = array('q')
+		self.containergenerations = array('i')
+		self.slots = array('q') # first row of each object number, or -1
+		self.overflow = {} # first row of object numbers beyond the slot table
+		self.outside = {} # row of keys that do not fit in the columns
+		self.outsiderows = {} # (key, value) of the rows that do not fit in the columns
+
+	def __len__(self):
+		return len(self.numbers)
+
+	def firstrow(self, number):
+		if 0 <= number < len(self.slots):
+			return self.slots[number]
+		return self.overflow.get(number, -1)
+
+	def setfirstrow(self, number, row):
+		if number >= len(self.slots) and number < max(1024, 4*len(self.numbers)):
+			self.growslots(max(number+1, 2*len(self.slots)))
+		if 0 <= number < len(self.slots):
+			self.slots[number] = row
+		else:
+			self.overflow[number] = row
+
+	def growslots(self, size):
+	# extends the slot table, and moves the object numbers that now fit from the overflow dict into it
+		self.slots.extend(array('q', [-1])*(size-len(self.slots)))
+		for number in [i for i in self.overflow if 0 <= i < size]:
+			self.slots[number] = self.overflow.pop(number)
+
+	def findrow(self, key):
+		number, generation = key
+		if not fits(number, generation):
+			return self.outside.get(key, -1)
+		row = self.firstrow(number)
+		while row >= 0 and self.generations[row] != generation:
+			row = self.chain[row]
+		return row
+
+	def __contains__(self, key):
+		return self.findrow(key) >= 0
+
+	def key(self, row):
+		if self.outsiderows and row in self.outsiderows:
+			return self.outsiderows[row][0]
+		return self.numbers[row], self.generations[row]
+
+	def value(self, row):
+		if self.outsiderows and row in self.outsiderows:
+			return self.outsiderows[row][1]
+		if self.containers:
+			return (self.containernumbers[row], self.containergenerations[row]), self.offsets[row]
+		return self.offsets[row]
+
+	def get(self, key, default=None):
+		row = self.findrow(key)
+		if row < 0:
+			return default
+		return self.value(row)
+
+	def __getitem__(self, key):
+		row = self.findrow(key)
+		if row < 0:
+			raise KeyError(key)
+		return self.value(row)
+
+	def __setitem__(self, key, value):
+		if self.containers:
+			container, offset = value
+		else:
+			container, offset = None, value
+		row = self.findrow(key)
+		number, generation = key
+		if not fits(number, generation) or not fits(offset, 0) or (container is not None and not fits(*container)):
+			if row < 0:
+				row = len(self.numbers)
+				self.numbers.append(-1)
+				self.generations.append(-1)
+				self.offsets.append(-1)
+				self.chain.append(-1)
+				if self.containers:
+					self.containernumbers.append(-1)
+					self.containergenerations.append(-1)
+				if fits(number, generation):
+					self.numbers[row], self.generations[row] = number, generation
+					self.chain[row] = self.firstrow(number)
+					self.setfirstrow(number, row)
+				else:
+					self.outside[key] = row
+			self.outsiderows[row] = (key, value)
+		elif row < 0:
+			row = len(self.numbers)
+			self.numbers.append(number)
+			self.generations.append(generation)
+			self.offsets.append(offset)
+			self.chain.append(self.firstrow(number))
+			if self.containers:
+				self.containernumbers.append(container[0])
+				self.containergenerations.append(container[1])
+			self.setfirstrow(number, row)
+		else:
+			self.outsiderows.pop(row, None)
+			self.offsets[row] = offset
+			if self.containers:
+				self.containernumbers[row] = container[0]
+				self.containergenerations[row] = container[1]
+
+	def __iter__(self):
+		if self.outsiderows:
+			for row in range(len(self.numbers)):
+				yield self.key(row)
+			return
+		for row in range(len(self.numbers)):
+			yield self.numbers[row], self.generations[row]
+
+	def keys(self):
+		return iter(self)
+
+	def items(self):
+		for row in range(len(self.numbers)):
+			yield self.key(row), self.value(row)
+
+	def update(self, items):
+		for key, value in items:
+			self[key] = value
+
+	def footprint(self):
+	# memory used by the index in bytes, without the overflow dict
+		columns = (self.numbers, self.generations, self.offsets, self.chain, self.containernumbers, self.containergenerations, self.slots)
+		return sum(i.itemsize*len(i) for i in columns)
@@ -19,11 +19,18 @@
 
 import os							# only used for checking file size, and file existance
 import sys							# for aborting, getting/setting recursion limit
-import argparse 					# ...
 import zlib							# at least for flatedecode
-from ascii85 import ascii85decode 	# for decoding
-from lzw import lzwdecode			# for decoding
-from ccitt import ccittfaxdecode	# for decoding
+import re							# for the lexer
+import io							# for capturing the report of a file in batch mode
+import contextlib					# ...
+import hashlib						# for the key of the audit cache
+import threading					# for the messages of streams decoded in the background
+from pdfbuffer import PDFBuffer, openpdf, readpdf	# memory mapped input
+from objectindex import ObjectIndex	# object locations in arrays
+from objectcache import ObjectCache	# parsed objects within a memory budget
+# Modules that are only needed for some documents or options are imported when first used, to keep the start up time short (see --startup-profile): 
+# ascii85, lzw, predictor and ccitt for decoding, random for --trust-xref, concurrent.futures for batch mode, argparse for the command line. 
+lazymodules = ['argparse', 'tempfile', 'ascii85', 'lzw', 'predictor', 'ccitt', 'random', 'concurrent.futures', 'signatures']
 
 apversion='''pdfaudit v0.8'''
 apdescription='''pdfaudit is a pdf auditing tool for security and privacy'''
@@ -78,15 +85,83 @@ newlinelist = [13, 10] # CR, LF
 followlinkslist = ['Length', 'S', 'OpenAction', 'AA'] # Need to follow links in these cases
 readobjectdefaultlist = ['true', 'false', 'endobj', '>', ']', 'null']
 characterlist="acdeghijklmopqsuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ"
+# A token is either a single delimiter, or a regular word including one trailing white-space character. White-space and % comments before the token are skipped. At EOF the match is empty. 
+tokenpattern = re.compile(rb'[\x00\t\n\x0c\r ]*(?:%[^\r\n]*[\x00\t\n\x0c\r ]*)*(?:([^\x00\t\n\x0c\r ()<>\[\]{}/%]+)[\x00\t\n\x0c\r ]?|([()<>\[\]{}/]))?')
+inventorypattern = re.compile(rb'[0-9a-z]') # the inventory only looks at words starting with these characters
+inventorystopwords = {b'endobj', b'ObjStm', b'Length', b'stream'}
+# Keywords of the document structure, being words surrounded by white-space or delimiters. Group 1 and 2 are the object number and generation of 'obj'. 
+inventorykeywords = re.compile(rb'(?<![^\x00\t\n\x0c\r ()<>\[\]{}/%])(?:(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+obj|endobj|xref|trailer|startxref|stream|ObjStm|Length)(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])')
+# Cross reference table: subsection header, and 20 byte entries. An object header at a position given by the cross reference information. 
+xrefsubsection = re.compile(rb'[\x00\t\n\x0c\r ]*(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+(?=\d{10}[\x00\t\n\x0c\r ])')
+xrefentry = re.compile(rb'[\x00\t\n\x0c\r ]*(\d{10})[\x00\t\n\x0c\r ]+(\d{5})[\x00\t\n\x0c\r ]+([nf])')
+objectheader = re.compile(rb'[\x00\t\n\x0c\r ]*(\d+)[\x00\t\n\x0c\r ]+(\d+)[\x00\t\n\x0c\r ]+obj(?![^\x00\t\n\x0c\r ()<>\[\]{}/%])')
 printable=" !#$%&()*+,-./0123456789:;<=>?@ABCDEFGHIJKLMNOPQRSTUVWXYZ[]^_`abcdefghijklmnopqrstuvwxyz{|}~';"
 counttable = {}
-crossreflist = {}
-objstmlist = {}
-crossreflistcompressed = {}
-crossreflistvfy = {}
-scannedobjects = {}
+crossreflist = ObjectIndex() # objects found by the inventory: (objectnumber,generation) -> offset
+objstmlist = ObjectIndex() # the object streams among these
+crossreflistcompressed = ObjectIndex()
+crossreflistvfy = ObjectIndex()
+structuretable = {} # findings on the document structure itself, like incorrect stream lengths
+scannedobjects = ObjectCache() # parsed objects: (objectnumber,generation) -> value, see evictobject()
+objectcachesize = 0 # memory budget of scannedobjects in bytes, 0 for no limit
+evictedstreams = {} # stream handles of objects evicted from scannedobjects, without their decoded data
 verbosity = 1 # 0 minimal, 1 default, 2 detail, 3 debug
+showstructure = False # print the document structure when making the inventory
 currentobject = ''
+documentfile = None # buffer of the pdf document, see jumptoobject()
+parsingobject = None # the indirect object being parsed, see readobjectas()
+objstmindex = ObjectIndex(containers=True) # compressed objects: (objectnumber,0) -> (object stream, offset of the object in the decoded object stream)
+objstmbuffers = {} # decoded object streams kept in memory, see getobjstmbuffer()
+expandobjstm = True # whether enddictionary() iterates through the objects of an object stream
+maxdepth = 100 # maximum nesting of arrays, dictionaries and followed references kept by readobject()
+nestingdepth = 0 # nesting of the object being read, in the objects it was followed from
+followedobjects = set() # objects being read by jumptoobject(), a reference to one of these is a cycle and not followed again
+trustxref = False # use the cross reference information instead of the inventory, see readxrefchain()
+xrefsample = 16 # number of object positions checked by verifyxref()
+singlepass = False # parse objects when the inventory finds them, instead of in a second pass
+failfast = False # end the audit at the first finding of a key in failfastkeys, see addfinding()
+defaultfailfastkeys = ['JavaScript','Launch','OpenAction']
+failfastkeys = list(defaultfailfastkeys) # keys of counttable that end the audit in fail fast mode
+failfastexit = 3 # exit code of the command line when the audit ended at such a finding
+stoppedat = None # (key, object, examined bytes) of the finding that ended the audit in fail fast mode
+triageresult = None # in triage mode: 'skipped' when the full parse was skipped, or 'parsed'
+inventoryrunning = False
+pendinglist = {} # single pass: objects with references to objects not yet found, to be parsed again after the inventory
+inventorymode = 'tokens' # 'tokens' or 'regex', see getdocumentstructure()
+defaultdecodepolicy = ['ObjStm', 'XRef', 'JavaScript', 'XFA', 'EmbeddedFile']
+decodepolicy = list(defaultdecodepolicy) # streams that are decoded during the audit; by /Type, by the key referring to it, or 'all'
+streamreferencelist = {'JS': 'JavaScript', 'XFA': 'XFA'} # keys referring to streams, and the stream category used in decodepolicy
+embeddedfilelist = ['F', 'UF', 'DOS', 'Mac', 'Unix'] # keys of the /EF dictionary of a file specification, referring to embedded file streams (which need not have /Type /EmbeddedFile)
+streamcontext = {} # objects referred to by keys in streamreferencelist (or embeddedfilelist) before they were parsed
+streamstats = {'decoded': [0,0], 'skipped': [0,0]} # number of streams and their size in bytes
+recordsteps = False # keep a log of each step of iterateobjectlist(), so the audit of a later revision can resume from it, see auditstep()
+steplog = None # log of the current step
+revisionsteps = [] # logs of all steps, in order
+resumestate = None # state of a previous revision of the document to resume from, see restorerevision()
+resumesteps = {} # logs of the steps of the previous revision, by object
+redefinedobjects = set() # objects that are new or moved since the previous revision
+replayedobjects = {} # objects parsed in replayed steps, not read again until needed: object -> None, or (object stream, offset)
+silentparse = False # reading an object again without recording findings or stream statistics, see readreplayed()
+inventoryopen = False # whether the inventory ended inside an object
+revisionend = re.compile(rb'%%EOF[\r\n]*') # end of a revision of the document
+decodethreads = 1 # number of threads decoding streams in the background; 1 decodes them when parsed, see PDFStream.prefetch()
+decodewindow = 64 # maximum number of streams being decoded in the background; the oldest is waited for first
+decodepool = None # ThreadPoolExecutor, started when first used
+decodepoolsize = 0
+pendingdecodes = [] # streams decoded in the background, in the order they were parsed, see collectdecoded()
+decodefutures = {} # object streams decoded in the background before being parsed, see prefetchobjstms()
+shards = 1 # number of worker processes parsing the objects of a single document, see shardobjectlist()
+shardsource = None # path of the document and the options of the audit, for the shard workers
+decodinglog = threading.local() # messages of a decoding thread, printed when its result is taken in
+signaturelist = None # (name, signature) searched for in each decoded stream, see searchstream()
+signatureset = None # signaturelist compiled, see getsignatureset()
+triage = False # search the document for the names in riskydictionary first, and skip the full parse if there are none, see triagedocument()
+triagepattern = None # made from riskydictionary when first used, see triagenames()
+nestingpattern = None # (maxdepth, pattern) made when first used, see triagenesting()
+nestingbytes = bytes(i for i in range(256) if i not in b'[]<>()') # the bytes left out by triagenesting()
+objectstart = re.compile(rb'(\d+)\s+(\d+)\s+obj') # used to find the object around an ObjStm name
+showprogress = True # progress indication on screen; not in batch mode
+progressoutput = sys.stdout # progress is printed here, so it is not part of a captured report
 startobjsearchpos = 1
 riskydictionary = {
 #	('S','GoTo')      : 'D', # TODO: remove?
@@ -117,12 +192,9 @@ def isdelimiter(char):
 	
 def nextchar(file):
 # read next char, leave seek position as-is
-	nchar=file.read(1)
-	if nchar==b'':
+	if file.pos >= file.size:
 		return ""
-	singlebyte = chr(nchar[0])
-	file.seek(-1,1)
-	return singlebyte
+	return chr(file.data[file.pos])
 
 def makeprintable(string):
 	pstring=""
@@ -135,10 +207,37 @@ def makeprintable(string):
 
 def vprint(string,verbositylevel=1,delimiter='\n'):
 	if verbositylevel <= verbosity:
+		messages=getattr(decodinglog,'messages',None)
+		if messages is not None: # in a decoding thread
+			messages.append((string,verbositylevel,delimiter))
+			return
 		print(makeprintable(string), end=delimiter)
 
-def halt(message=""):
-	sys.exit("EXIT: "+message)
+class PDFAuditError(Exception):
+# Raised when the audit of a document can not continue
+	pass
+
+class PDFSyntaxError(PDFAuditError):
+# The document can not be parsed at some position
+	pass
+
+class PDFStructureError(PDFAuditError):
+# The document misses a required part, like its header or a referenced object
+	pass
+
+class FailFastStop(Exception):
+# Raised by addfinding() in fail fast mode to end the audit; not an error
+	pass
+
+parsererrors = (ValueError, RecursionError, zlib.error) # raised by the parsing functions on malformed input, like int() on a token that is not a number, see Auditor.audit()
+auditerrors = {'PDFAuditError': PDFAuditError, 'PDFSyntaxError': PDFSyntaxError, 'PDFStructureError': PDFStructureError} # to raise errors stored in the AuditCache again
+
+def halt(message="",error=PDFSyntaxError):
+	raise error(message)
+
+def printprogress(string):
+	progressoutput.write(string+'\r')
+	progressoutput.flush()
 
 def num(s):
 	if isinstance(s,str):
@@ -148,48 +247,67 @@ def num(s):
 	else:
 		halt("Error converting object to number")
 
+def intvalue(s):
+# converts a number token to an integer, a real number (like a Length of 12.0) by leaving out its fraction, so a large integer keeps its precision
+	whole=s.split('.')[0]
+	if whole.strip('-'):
+		return int(whole)
+	return 0
+
+def scantoken(file,pos):
+# Returns the token found at pos as (pos, word, tokenpos, endpos). PDF treats any sequency of consequtive white-space characters as one character. 
+	match = tokenpattern.match(file.data,pos)
+	if match.lastindex is None: # EOF
+		return (pos, "", match.end(), match.end())
+	return (pos, match.group(match.lastindex).decode('latin-1'), match.start(match.lastindex), match.end())
+
 def getword(file):
-# Return next word or next delimiter, or an empty string at EOF
-# PDF treats any sequency of consequtive white-space characters as one character
-# TODO: check overall corectness ans efficiency of the if / elif flow
-	foundword= ""
-	delimiter=False
-	while not delimiter:
-		singlebyte = file.read(1)
-		if singlebyte == b'': # EOF
-			return foundword
-		if verbosity > 4:
-			vprint("{POS: "+
-				str(file.tell()-1)+
-				", value: "+
-				str(singlebyte[0])+
-				", stringempty: +"+
-				str(foundword==""), 3)
-		delimiter = (singlebyte[0] in whitespacelist + delimiterlist)
-		if foundword == "" and singlebyte[0] in whitespacelist:
-			# ignore trailing whitespaces
-			delimiter = False
-		elif singlebyte[0] == 37: 
-			# ignore % comments
-			readcomment(file)
-		elif not delimiter:
-			# add non-whitespace/delimiter
-			foundword += chr(singlebyte[0])
-		elif singlebyte[0] in delimiterlist:
-			if foundword == "":
-				# send delimiter if it's the first character we encounter
-				foundword += chr(singlebyte[0])
-			else:
-				# read this character next time; so seek one position back
-				file.seek(-1,1)
-	return foundword
+# Return next word or next delimiter, or an empty string at EOF. Words that were already scanned by peekwords() are taken from the lookahead buffer of the file, as long as the file position was not changed in the mean time. 
+	lookahead = file.lookahead
+	if lookahead:
+		if lookahead[0][0] == file.pos:
+			token = lookahead.popleft()
+			file.pos = token[3]
+			return token[1]
+		lookahead.clear()
+	token = scantoken(file,file.pos)
+	if verbosity > 4:
+		vprint("{POS: "+str(token[2])+", token: "+token[1]+"}",3)
+	file.pos = token[3]
+	return token[1]
+
+def peekwords(file,n):
+# Returns the next n words, and leave the file position as-is
+	lookahead = file.lookahead
+	if lookahead and lookahead[0][0] != file.pos:
+		lookahead.clear()
+	while len(lookahead) < n:
+		if lookahead:
+			pos = lookahead[-1][3]
+		else:
+			pos = file.pos
+		lookahead.append(scantoken(file,pos))
+	return [lookahead[i][1] for i in range(n)]
+
+def scanuntil(file,stopwords):
+# Scans over words in bulk until one of the stopwords (a set of bytes) is found, and returns it, or an empty string at EOF. The file position is set right after the returned word. 
+	file.lookahead.clear()
+	word = b''
+	for match in tokenpattern.finditer(file.data,file.pos):
+		if match.lastindex is None: # EOF
+			word = b''
+			break
+		word = match.group(match.lastindex)
+		if word in stopwords:
+			break
+	else:
+		match = None
+	if match is not None:
+		file.pos = match.end()
+	return word.decode('latin-1')
 
 def getnexttwowords(file):
-	startpos = file.tell()
-	foundword1 = getword(file) 
-	foundword2 = getword(file)
-	file.seek(startpos)
-	return foundword1, foundword2
+	return peekwords(file,2)
 
 def dictionaryappendlist(dictionary,key,value):
 	if key in dictionary:
@@ -198,6 +316,30 @@ def dictionaryappendlist(dictionary,key,value):
 		dictionary[key]=[value]
 	return dictionary
 
+def addfinding(key,objectandvalue):
+# adds a threat to counttable, and to the log of the current step
+	if silentparse:
+		return
+	dictionaryappendlist(counttable,key,objectandvalue)
+	if steplog is not None:
+		steplog['findings'].append((key,objectandvalue[0],objectandvalue[1]))
+	if failfast and key in failfastkeys:
+		raise FailFastStop(key)
+
+def stopaudit(file,stop):
+# Ends the audit at the finding that raised FailFastStop. While the inventory is running (single pass mode), the document is examined up to the current position; afterwards the inventory has examined all of it. 
+	global stoppedat
+	if inventoryrunning:
+		examined=file.tell()
+	else:
+		examined=file.size
+	stoppedat=(str(stop),currentobject,examined)
+	if showprogress:
+		printprogress("                                                            ")
+	print("\nStopped at /"+str(stop)+" in object "+str(currentobject[0])+" "+str(currentobject[1])+
+		", examined "+str(examined)+" of "+str(file.size)+" bytes ("+str(int(100*examined/max(file.size,1)))+"%)")
+	showthreats()
+
 def checkdictionary(dictionary):
 # builds a dictionary of keys found to be risky. New keys are added in the dictionary as new key/object pairs, or an object is appended to already existing key/object pair(s) 
 	global currentobject
@@ -210,12 +352,12 @@ def checkdictionary(dictionary):
 			objectandvalue = (	currentobject,
 								"".join(dictionary.get(riskydictionary.get(keyvaluepair,""),"")))
 			key=keyvaluepair[1]
-			dictionaryappendlist(counttable,key,objectandvalue)
+			addfinding(key,objectandvalue)
 		elif keyvaluepairempty in list(riskydictionary.keys()):
 			objectandvalue = (	currentobject,
 								"".join(dictionary.get(i                                    ,"")))
 			key=i
-			dictionaryappendlist(counttable,key,objectandvalue)
+			addfinding(key,objectandvalue)
 
 # FEATURE?
 def streamistext(string):
@@ -226,103 +368,360 @@ def streamistext(string):
 	else:
 		vprint("Text-only stream content encounterd: "+dstring,1)
 
-def getdictionary(file,followlinks=False):
-# sequence of key - object pairs, of which at least the key is a /name (without slash)
+def enddictionary(file,dictionary):
+# Called by readobject() when the key - object pairs of a dictionary, of which at least the key is a /name (without slash), are read. 
 # it may be followed by a stream, which is encapsulated by the words "stream" and "endstream"
-# TODO: handling of specific keys and return values (Length, Size): from global to variables to returns from this function (as this function may be called recursively)
+# TODO: handling of specific keys and return values (Length, Size): from global to variables to returns from this function
 # TODO: the stream itself needs to be checked "in the context to which it is referred to"
-	global globaldictvaluesize # TODO: from global variable to return'd value from this function
-	vprint("[DICT]", 2, '')
-	getkey = ""
-	getobject = ""
-	dictionary = {}
-	while getkey != '>' and getobject != '>':
-		getkey = readobject(file)
-		getobject = readobject(file,getkey in followlinkslist)
-		dictionary[getkey] = getobject
 	nword, nnword = getnexttwowords(file)
 	
 	if nword == 'stream':
 		#TODO: followsymlinks handling in case stream can have symlinks
-		length=num(dictionary.get("Length"))
+		length=dictionary.get("Length")
 		getword(file) # actually read the word 'stream' (including trailing delimiter)
 		file.seek(-1,1) #stream follows after 'stream\r\n' or 'stream\n'
 		if ord(nextchar(file)) == 13: # \r
 			file.read(2) # read 'stream\r\n'
 		else:
 			file.read(1) # read 'stream\n'
-		stream=file.read(length)
+		if isinstance(length,str) and isnum(length):
+			length=intvalue(length)
+		else: # a Length that is not found, like a reference further on in single pass mode; the object is then parsed again after the inventory, see jumptoobject()
+			vprint("[STREAM] Length unresolved: "+str(length),2)
+			length=findstreamend(file,file.tell())
+		length=max(0,min(length,file.size-file.tell()))
+		stream=PDFStream(file,file.tell(),length,dictionary.get("Filter"),dictionary.get("DecodeParms"))
+		file.seek(length,1)
 		vprint(" ",2)
 		vprint("[STREAM] "+str(length)+" bytes",2)
-		if "Filter" in list(dictionary.keys()):
-			filterlist = dictionary.get("Filter")
-			if isinstance(filterlist,str):
-				filterlist=[filterlist]
-			for streamfilter in list(filterlist):
-				vprint("[DECODE]: "+streamfilter+" ",2,'')
-				if streamfilter == "FlateDecode":
-					#TODO: Predictor filters not implemented yet, see getxrefstream(). It is possible we encounter an xrefstream as we might not explicitly have searched and parsed one. 
-					try:
-						stream=zlib.decompress(stream)
-						vprint(makeprintable(stream),3)
-					except:
-						try:
-							vprint("zlib error; streamlength: "+str(len(stream))+
-								", firstbyte: "+str(stream[0])+
-								", lastbyte: "+str(stream[len(stream)-1])+
-								", ZLIB runtime version: "+zlib.ZLIB_RUNTIME_VERSION,2)
-						except:
-							vprint("No return stream given by zlib",2)
-				elif streamfilter == 'ASCII85Decode':
-					stream=ascii85decode(stream)
-				elif streamfilter == 'LZWDecode':
-					stream=lzwdecode(stream)
-#				elif streamfilter == 'CCITTFaxDecode':
-#					vprint("[FILTER]: "+streamfilter,3)
-#					ccittfaxdecode(stream) #TODO: needs additional arguments
-				elif streamfilter == '/':
-					pass
-				else:
-					vprint("Filter not implemented: "+streamfilter+", found in object: "+
-						str(currentobject[0])+" "+str(currentobject[1]),1)
-					# TODO: use counttable instead to give list of unimplemented filters with objects at the end of the scan. 
-					# TODO: need to break here if multiple compressions are used of which one fails to prevent error out. 
 		getword(file) # the word endstream
 		vprint("[STREAM: end]",2)
-		if dictionary.get("Type")=="XRef":
-			vprint("[XRef]",2)
-			dictionary["Stream"]=stream
-		elif dictionary.get("Type")=="ObjStm":
-			vprint("[STREAM]: open ObjStm",2)
-			f=open(".pdfaudit","w+b")
-			f.write(stream)
-			f.write(bytearray([13,13,13]))
-			f.seek(0)
-			iterateobjstm(f,num(dictionary.get("N")))
-			f.close()
-			#TODO: delete file
-			vprint("[STREAM]: close ObjStm",2)
+		dictionary["Stream"]=stream
+		if dictionary.get("Type")=="ObjStm":
+			if decodeallowed("ObjStm") and expandobjstm:
+				vprint("[STREAM]: open ObjStm",2)
+				collectdecoded() # the streams parsed before are searched first, see searchstream()
+				with PDFBuffer(stream.data()) as f: # parsed from memory
+					iterateobjstm(f,num(dictionary.get("N")),dictionary.get("First"),parsingobject)
+				stream.release()
+				vprint("[STREAM]: close ObjStm",2)
 		else:
-			dictionary["Stream"]=stream.decode('utf-8','ignore')
+			if dictionary.get("Type")=="XRef":
+				vprint("[XRef]",2)
+			if decodeallowed(dictionary.get("Type")):
+				stream.prefetch()
 #			streamistext(stream)
 		#TODO: followsymlinks handling in case stream can have symlinks
 	vprint("[DICT: end]",2,'')
+	for i in streamreferencelist:
+		if i in dictionary:
+			decodereferenced(dictionary.get(i),streamreferencelist.get(i))
+	if isinstance(dictionary.get("EF"),dict):
+		for i in embeddedfilelist:
+			if i in dictionary.get("EF"):
+				decodereferenced(dictionary.get("EF").get(i),"EmbeddedFile")
 	checkdictionary(dictionary)
 	return dictionary # TODO: check if we can return more here
+
+class PDFStream:
+# Handle on the data of a stream: its offset and length in the buffer it was parsed from (the pdf document, or a decoded object stream), and the filters to decode it with. The raw data is only sliced from the buffer when it is decoded, so a handle does not keep a view on the memory map. The stream is only decoded when its data is asked for, which is during the audit determined by decodepolicy. The handle keeps track of the number of decoded and skipped streams in streamstats. 
+# With decodethreads, a stream can be decoded in the background with prefetch(); data() then waits for the result. Object streams decoded ahead by prefetchobjstms() are taken over when the object is parsed. 
+	def __init__(self,buffer,offset,length,filterlist,decodeparms=None):
+		self.buffer=buffer
+		self.offset=offset
+		self.length=length
+		self.filterlist=filterlist
+		self.decodeparms=decodeparms
+		self.counted=not silentparse # streams of objects that are read again are not counted twice
+		self.key=parsingobject # the object the stream is in
+		self.searched=False
+		self.decoded=None
+		self.future=None
+		if self.counted and parsingobject in decodefutures:
+			size, future = decodefutures.pop(parsingobject)
+			if size == length:
+				self.future=future
+		self.state='skipped'
+		countstream(self.state,self,1)
+
+	def __len__(self):
+		return self.length
+
+	def rawdata(self):
+	# zero-copy view on the (still encoded) data of the stream
+		return memoryview(self.buffer.data)[self.offset:self.offset+self.length]
+
+	def footprint(self):
+	# memory held by the handle, see objectsize(); the raw data is part of the memory map
+		return 120 + (len(self.decoded) if self.decoded is not None else 0)
+
+	def prefetch(self):
+	# Decodes the stream in the background when decoding threads are used, or else right away. The results are taken in by collectdecoded(), in the order the streams were parsed, so the report does not depend on the number of threads. 
+		if self.future is not None: # being decoded already
+			return
+		if decodethreads <= 1 or not self.counted or self.decoded is not None:
+			self.data()
+			return
+		self.future=getdecodepool().submit(decodeinthread,self.rawdata(),self.filterlist,self.decodeparms,self.key)
+		pendingdecodes.append(self)
+		if len(pendingdecodes) > decodewindow:
+			pendingdecodes.pop(0).data()
+
+	def data(self):
+		if self.decoded is None:
+			if self.future is not None:
+				self.decoded, messages = self.future.result()
+				self.future=None
+				for string, level, delimiter in messages:
+					vprint(string,level,delimiter)
+			else:
+				self.decoded=decodestream(self.rawdata(),self.filterlist,self.decodeparms)
+			if self.state=='skipped':
+				countstream(self.state,self,-1)
+				self.state='decoded'
+				countstream(self.state,self,1)
+			if signaturelist and self.counted and not self.searched:
+				searchstream(self)
+			scannedobjects.resize(self.key)
+		return self.decoded
+
+	def release(self):
+	# frees the decoded data, which is decoded again when asked for
+		self.decoded=None
+
+	def uncount(self):
+	# removes the stream from streamstats, when the object containing it is parsed again
+		countstream(self.state,self,-1)
+		self.counted=False # also when it is still being decoded
+
+def getdecodepool():
+	global decodepool, decodepoolsize
+	if decodepool is None or decodepoolsize != decodethreads:
+		import concurrent.futures
+		if decodepool is not None:
+			decodepool.shutdown(wait=False)
+		decodepool=concurrent.futures.ThreadPoolExecutor(max_workers=decodethreads)
+		decodepoolsize=decodethreads
+	return decodepool
+
+def decodeinthread(raw,filterlist,decodeparms,objectkey):
+# Decodes a stream in a decoding thread. zlib releases the GIL, so parsing goes on meanwhile. Messages are kept to be printed with the result. 
+	decodinglog.messages=[]
+	try:
+		return decodestream(raw,filterlist,decodeparms,objectkey), decodinglog.messages
+	finally:
+		decodinglog.messages=None
+
+def collectdecoded():
+# Takes in the results of all streams being decoded in the background, in the order they were parsed
+	while pendingdecodes:
+		pendingdecodes.pop(0).data()
+
+def prefetchobjstms(file):
+# Starts decoding all object streams in the background, before iterateobjectlist() expands them one by one. Only the dictionary of each object stream is read here. 
+	global silentparse, expandobjstm
+	if decodethreads <= 1 or not decodeallowed("ObjStm"):
+		return
+	previoussilent=silentparse
+	previousexpand=expandobjstm
+	silentparse=True
+	expandobjstm=False
+	startpos=file.tell()
+	try:
+		for key in objstmlist:
+			file.seek(objstmlist.get(key))
+			try:
+				dictionary=readindirectobject(file)
+			except PDFAuditError:
+				continue # reported when the object is parsed
+			if isinstance(dictionary,dict) and isinstance(dictionary.get("Stream"),PDFStream):
+				stream=dictionary.get("Stream")
+				decodefutures[key]=(len(stream),getdecodepool().submit(decodeinthread,stream.rawdata(),stream.filterlist,stream.decodeparms,key))
+	finally:
+		silentparse=previoussilent
+		expandobjstm=previousexpand
+		file.seek(startpos)
+
+def getsignatureset():
+# Compiles signaturelist when it is first used, or changed
+	global signatureset
+	if signatureset is None or signatureset.source is not signaturelist:
+		from signatures import SignatureSet
+		signatureset=SignatureSet(signaturelist)
+	return signatureset
+
+def searchstream(stream):
+# Searches the decoded stream for the signatures, once per stream. Each signature found is a finding of the object the stream is in, with the offset of its first match in the decoded data. 
+	stream.searched=True
+	objectkey=stream.key if stream.key is not None else currentobject
+	for name, (offset, count) in getsignatureset().search(stream.decoded).items():
+		addfinding("Signature",(objectkey,name+" at offset "+hex(offset)+(" ("+str(count)+" matches)" if count > 1 else "")))
+
+def countstream(state,stream,n):
+	if not stream.counted:
+		return
+	streamstats[state][0]+=n
+	streamstats[state][1]+=n*len(stream)
+
+def decodeallowed(category):
+	return 'all' in decodepolicy or category in decodepolicy
+
+def decodestream(stream,filterlist,decodeparms=None,objectkey=None):
+# Applies the filters to the stream data, and returns the decoded data as bytes. DecodeParms is either a single dictionary, or a list with an entry per filter. objectkey is the object the stream is in, when it is decoded in a decoding thread. 
+	if objectkey is None:
+		objectkey=currentobject
+	if filterlist is None:
+		return bytes(stream)
+	if isinstance(filterlist,str):
+		filterlist=[filterlist]
+	if not isinstance(decodeparms,list):
+		decodeparms=[decodeparms]
+	for i, streamfilter in enumerate(list(filterlist)):
+		vprint("[DECODE]: "+streamfilter+" ",2,'')
+		if streamfilter == "FlateDecode":
+			try:
+				stream=zlib.decompress(stream)
+				stream=reversepredictor(stream,decodeparms[i] if i < len(decodeparms) else None)
+				vprint(makeprintable(stream),3)
+			except:
+				try:
+					vprint("zlib error; streamlength: "+str(len(stream))+
+						", firstbyte: "+str(stream[0])+
+						", lastbyte: "+str(stream[len(stream)-1])+
+						", ZLIB runtime version: "+zlib.ZLIB_RUNTIME_VERSION,2)
+				except:
+					vprint("No return stream given by zlib",2)
+		elif streamfilter == 'ASCII85Decode':
+			from ascii85 import ascii85decode
+			stream=ascii85decode(stream)
+		elif streamfilter == 'LZWDecode':
+			from lzw import lzwdecode
+			stream=reversepredictor(lzwdecode(stream),decodeparms[i] if i < len(decodeparms) else None)
+#		elif streamfilter == 'CCITTFaxDecode':
+#			vprint("[FILTER]: "+streamfilter,3)
+#			from ccitt import ccittfaxdecode
+#			ccittfaxdecode(stream) #TODO: needs additional arguments
+		elif streamfilter == '/':
+			pass
+		else:
+			vprint("Filter not implemented: "+streamfilter+(", found in object: "+
+				str(objectkey[0])+" "+str(objectkey[1]) if isinstance(objectkey,tuple) else ""),1)
+			# TODO: use counttable instead to give list of unimplemented filters with objects at the end of the scan. 
+			# TODO: need to break here if multiple compressions are used of which one fails to prevent error out. 
+	return bytes(stream)
+
+def reversepredictor(stream,decodeparms):
+# Reverses the predictor of a FlateDecode or LZWDecode filter, if given in its DecodeParms
+	if not isinstance(decodeparms,dict) or decodeparms.get("Predictor","1") == "1":
+		return stream
+	vprint("[Predictor]",2,'')
+	from predictor import applypredictor
+	try:
+		return applypredictor(stream,num(decodeparms.get("Predictor")),
+			num(decodeparms.get("Colors","1")),
+			num(decodeparms.get("BitsPerComponent","8")),
+			num(decodeparms.get("Columns","1")))
+	except ValueError as error:
+		vprint("Predictor error: "+str(error),2)
+		return stream
+
+def decodereferenced(value,category):
+# Decodes the stream(s) referred to by a key like JS or XFA, if the policy allows it. If the referred object was not scanned yet, the category is stored in streamcontext, and the stream is decoded when the object is parsed. 
+	if silentparse or not decodeallowed(category):
+		return
+	if isinstance(value,list):
+		for i in value:
+			decodereferenced(i,category)
+	elif isinstance(value,dict):
+		if isinstance(value.get("Stream"),PDFStream):
+			value.get("Stream").prefetch()
+	elif isinstance(value,str) and value.endswith(' R'):
+		objectnum, generation, r = value.split()
+		key=(num(objectnum),num(generation))
+		if key in replayedobjects and key not in scannedobjects:
+			readreplayed(documentfile,key)
+		if key in scannedobjects:
+			logstep('hits',key)
+			decodereferenced(scannedobjects.get(key),category)
+		else:
+			logstep('misses',key)
+			streamcontext[key]=category
+
+def objectparsed(key,value):
+# called for each parsed indirect object, to decode streams that were referred to before the object was parsed. An object that is parsed again after the inventory (pendinglist) keeps its context until then. 
+	if key in streamcontext and not silentparse:
+		if key in pendinglist:
+			decodereferenced(value,streamcontext.get(key))
+		else:
+			decodereferenced(value,streamcontext.pop(key))
 		
-def iterateobjstm(file,n):
-# First read n objectnumber/byteoffset pairs, then iterate through all objects. The objects are also stored in the scannedobjects list
+def iterateobjstm(file,n,first,container):
+# First read n objectnumber/byteoffset pairs, then iterate through all objects. The objects are also stored in the scannedobjects list, and their location in objstmindex, so they can be read again individually by getcompressedobject(). 
 	global scannedobjects
 	key={}
+	offset={}
 	vprint("[ObjStm] xref table: ",2,"")
 	for i in range(n):
 		objectnumber = getword(file)
 		byteoffset = getword(file)
 		key[i] = (num(objectnumber),0)
+		offset[i] = num(byteoffset)
 		vprint('[ObJStm Object ] found: '+objectnumber+',0',2)
+	if first is None: # First is required, but assume the objects follow the pairs
+		first=file.tell()
 	for i in range(n):
 		vprint("[ObjStm Object]: "+str(i),2,'')
+		if steplog is not None and not silentparse:
+			if key[i] in scannedobjects or key[i] in replayedobjects:
+				steplog['unsafe']=True # replaces an object read before; the step can not be replayed
+			steplog['parsed'].append((key[i],(container,num(first)+offset[i])))
+			steplog['seen'].add(key[i])
+			steplog['objstm'].append((key[i],container,num(first)+offset[i]))
+		objstmindex[key[i]]=(container,num(first)+offset[i])
+		file.seek(num(first)+offset[i])
 		scannedobjects[key[i]]=readobject(file)
+		replayedobjects.pop(key[i],None)
+		evictedstreams.pop(key[i],None)
+
+def getcompressedobject(key):
+# Reads a single object from its object stream using objstmindex, without parsing the other objects in the object stream
+	container, offset = objstmindex.get(key)
+	vprint("[ObjStm Object]: "+str(key[0])+" in "+str(container[0])+" "+str(container[1]),2,'')
+	file=getobjstmbuffer(container)
+	file.seek(offset)
+	return readobject(file)
+
+def getobjstmbuffer(container):
+# Returns the decoded object stream, which is kept in memory until releaseobjstm() is called. The object stream is decoded again from its stream handle, or read again from the pdf document if needed. 
+	global expandobjstm
+	if container not in objstmbuffers:
+		dictionary=scannedobjects.get(container)
+		if container in evictedstreams: # decoded again from the handle of the evicted object
+			dictionary={"Stream":evictedstreams.get(container)}
+		elif not isinstance(dictionary,dict) or not isinstance(dictionary.get("Stream"),PDFStream):
+			startpos=documentfile.tell()
+			documentfile.seek(getobjectpos(container))
+			previousexpand=expandobjstm
+			expandobjstm=False
+			dictionary=readindirectobject(documentfile)
+			expandobjstm=previousexpand
+			documentfile.seek(startpos)
+		stream=dictionary.get("Stream")
+		collectdecoded()
+		objstmbuffers[container]=PDFBuffer(stream.data())
+		stream.release()
+	return objstmbuffers.get(container)
+
+def releaseobjstm(container):
+# drops a decoded object stream from memory; getobjstmbuffer() materialises it again when needed
+	buffer=objstmbuffers.pop(container,None)
+	if buffer is not None:
+		buffer.close()
+
+def releaseobjstms():
+# drops all decoded object streams at the end of a step of the audit, so these are only kept while objects of them are read one by one (getcompressedobject(), readreplayed())
+	for i in list(objstmbuffers):
+		releaseobjstm(i)
 
 def translatestring(string):
 # translates: \ddd, \n, \r, \t, \f, \b, \\, and ignores a single \
@@ -367,8 +766,12 @@ def getliteralstring(file):
 	vprint("[STR]",3,'')
 	foundstring= " ("
 	parenthesecount = 1
+	data = file.data
 	while parenthesecount > 0:
-		foundstring += chr(file.read(1)[0])
+		if file.pos >= file.size:
+			halt("Unterminated string at: "+hex(file.pos))
+		foundstring += chr(data[file.pos])
+		file.pos += 1
 		if foundstring[-1:]=='(':
 			if foundstring[-2:-1]==chr(92) and foundstring[-3:-2]!=chr(92):
 				pass
@@ -402,34 +805,22 @@ def gethexstring(file):
 # TODO uneven amount of pairs (append 0)
 # TODO translate to string? 
 	vprint("[HEX]",3,'')
-	hexstring=""
-	singlechar=""
-	while singlechar != '>':
-		singlechar = chr(file.read(1)[0])
-		if singlechar != '>':
-			hexstring += singlechar
+	end = file.find(b'>')
+	if end < 0:
+		halt("Unterminated hexadecimal string at: "+hex(file.pos))
+	hexstring = str(file.data[file.pos:end],'latin-1')
+	file.pos = end+1
 	hexstring=translatehexstring(hexstring)
 	vprint(hexstring+" ",2,'')
 	return hexstring
 
-def getarray(file):
-# returns single object or a list of objects
-	vprint("[ARRAY]",3,'')
-	foundarray=[]
-	while ']' not in foundarray:
-		foundarray.append(readobject(file,followlinks=False))
-	foundarray = foundarray[:-1]
-	vprint("[ARRAY END]",3,'')
-	if len(foundarray)==1:
-		return foundarray[0]
-	else:
-		return foundarray
-
 def isnum(checkword):
 #https://stackoverflow.com/questions/354038/how-do-i-check-if-a-string-is-a-number-float
 	return checkword.replace('.','',1).replace('-','',1).isdigit()
 
 def translatename(string):
+	if "#" not in string:
+		return string
 	sstring=""
 	i=0
 	while i<len(string): 
@@ -451,43 +842,67 @@ def getname(file):
 
 def getobjectpos(key):
 # Returns the object location found from the xref tables, or if it's not there, from the findobjects() scan done earlier. 
-	if key in list(crossreflist.keys()):
-		pos=crossreflist.get(key)
-	elif key in list(crossreflistvfy.keys()):
+	pos=crossreflist.get(key)
+	if pos is None:
 		pos=crossreflistvfy.get(key)
-	else:
-		halt("Object not found in crossreflist: "+str(key[0])+" "+str(key[1]))
+	if pos is None:
+		halt("Object not found in crossreflist: "+str(key[0])+" "+str(key[1]),PDFStructureError)
 	vprint("[OBJPOS]"+ hex(pos),2)
 	return pos
 
 def jumptoobject(file,objectnum,generation):
+# Returns the object, either from scannedobjects or by reading it from the pdf document. Note that the object is always read from documentfile, also when called while parsing an object stream. A reference to an object that is still being read (a cycle) is returned as is. 
 	global scannedobjects
+	file = documentfile
 	key = (num(objectnum),num(generation))
+	if key in replayedobjects and key not in scannedobjects:
+		readreplayed(file,key)
 	if key in scannedobjects.keys():
 		vprint("[STORED]",2,'')
+		logstep('hits',key)
 		return scannedobjects[key]
+	elif key in followedobjects:
+		vprint("[CYCLE]",2,'')
+		return objectnum+' '+generation+' R'
 	else:
+		logstep('parsed',key)
+		if key in objstmindex and key not in crossreflist:
+			followedobjects.add(key)
+			try:
+				foundvalue = getcompressedobject(key)
+			finally:
+				followedobjects.discard(key)
+			scannedobjects[key]=foundvalue
+			return foundvalue
+		if singlepass and inventoryrunning and key not in crossreflist and key not in crossreflistvfy:
+			# forward reference: parse the current object again when the inventory is complete
+			vprint("[PENDING]",2,'')
+			pendinglist[currentobject]=None
+			return objectnum+' '+generation+' R'
 		vprint("[JMP]",2,'')
 		startpos = file.tell()
 		key=num(objectnum),num(generation) # TODO: did we do this alread?
 		vprint('[JUMPTO:'+objectnum+','+generation+']',2)
 		file.seek(getobjectpos(key))
-		foundvalue = readindirectobject(file)#.get('SingleString')
+		followedobjects.add(key)
+		try:
+			foundvalue = readindirectobject(file)#.get('SingleString')
+		finally:
+			followedobjects.discard(key)
 		file.seek(startpos)
 		scannedobjects[key]=foundvalue
+		objectparsed(key,foundvalue)
 		return foundvalue
 
 def readcomment(file):
-	singlebyte = ''
-	comment = ''
-	while True:
-		singlebyte = file.read(1)
-		if singlebyte == b'': # EOF
-			break
-		elif singlebyte[0] not in newlinelist:
-			comment += chr(singlebyte[0])
-		else:
-			break
+# reads up to and including the next end of line marker, or up to EOF
+	data = file.data
+	size = file.size
+	end = file.pos
+	while end < size and data[end] not in newlinelist:
+		end += 1
+	comment = str(data[file.pos:end],'latin-1')
+	file.pos = min(end+1,size)
 	vprint("[COMMENT:]"+makeprintable(comment),3)
 	return comment
 
@@ -496,26 +911,100 @@ def readobject(file,followlinks=False):
 #TODO: difference between < something, << something, <something
 #TODO: stream which contains the word "endstream"
 #TODO: this function is called from more than one location, but not every objct type is expected in each case. Implement warning for those unexpected cases.
-#TODO: check correctness of handling: abc<def> vs abd<<def>> 	pword=""
-	foundword = getword(file)
-	vprint(foundword,4)
-	if foundword == '<':
-		if nextchar(file) == '<':
-			singlebyte = file.read(1)
-			return getdictionary(file,followlinks)
+#TODO: check correctness of handling: abc<def> vs abd<<def>>
+# Arrays and dictionaries are read with a stack of the containers that are open, instead of a call per nesting level, so deeply nested objects do not exhaust the interpreter stack. Containers nested deeper than maxdepth (counting the objects followed by links as well) are read and audited as usual, but are replaced by an empty one in the returned object, and reported as a MaxDepth finding. 
+	stack=[] # open containers: [list] for an array, or [dictionary, key, whether the key is read] for a dictionary
+	depth=nestingdepth
+	toodeep=False
+	while True:
+		foundword = getword(file)
+		if verbosity > 3:
+			vprint(foundword,4)
+		if foundword == '/':
+			value=getname(file)
+		elif foundword in readobjectdefaultlist: # like the > and ] that end a container
+			value=foundword
+		elif foundword == '[' or (foundword == '<' and nextchar(file) == '<'):
+			if foundword == '<':
+				file.pos += 1
+				vprint("[DICT]", 2, '')
+				stack.append([{},None,False])
+			else:
+				vprint("[ARRAY]",3,'')
+				stack.append([[]])
+			depth += 1
+			if depth > maxdepth and not toodeep:
+				toodeep=True
+				addfinding("MaxDepth",(currentobject,"nested more than "+str(maxdepth)+" levels deep"))
+			continue
 		else:
-			return gethexstring(file)
+			if stack:
+				container=stack[-1]
+				followlinks=len(container) == 3 and container[2] and container[1] in followlinkslist
+			value=readvalue(file,foundword,followlinks,depth)
+		while stack: # add the value to the container it is in, and close the containers it ends
+			container=stack[-1]
+			if len(container) == 1:
+				container[0].append(value)
+				if value != ']':
+					break
+				foundarray=container[0][:-1]
+				vprint("[ARRAY END]",3,'')
+				if len(foundarray)==1:
+					value=foundarray[0]
+				else:
+					value=foundarray
+			else:
+				if not container[2]:
+					if not isinstance(value,str): # an array or dictionary can not be a key
+						halt("Dictionary key is not a name at: "+hex(file.tell()))
+					container[1]=value
+					container[2]=True
+					break
+				container[0][container[1]]=value
+				container[2]=False
+				if container[1] != '>' and value != '>':
+					break
+				value=enddictionary(file,container[0])
+			if depth > maxdepth:
+				value=type(container[0])()
+			depth -= 1
+			stack.pop()
+		if not stack:
+			return value
+
+def linkdepth():
+# Returns the number of references that can be followed within the recursion limit of the interpreter, as each takes a few calls (jumptoobject(), readindirectobject(), readobject(), readvalue(), ...) with some to spare for reading the last object
+	return (sys.getrecursionlimit()-200)//6
+
+def readvalue(file,foundword,followlinks=False,depth=0):
+# Returns the string, number or reference starting with foundword, see readobject(). A reference is followed when followlinks, unless the object it is in is nested maxdepth deep already, or more references are followed than the interpreter stack allows (see linkdepth()). A reference back to an object that is being read is not followed again, see jumptoobject(). 
+	global nestingdepth
+	if foundword == '<':
+		return gethexstring(file)
 	elif foundword == '(':
 		return getliteralstring(file)
-	elif foundword == '[':
-		return getarray(file)
 	elif isnum(foundword):
-		nword, nnword = getnexttwowords(file)
+		if file.pos < file.size and file.data[file.pos] in delimiterlist: # the next word is a delimiter, so not a reference
+			nword, nnword = '', ''
+		else:
+			nword, nnword = getnexttwowords(file)
 		if isnum(nword) and nnword == 'R':
 			getword(file)
 			getword(file)
+			if followlinks and depth >= maxdepth:
+				addfinding("MaxDepth",(currentobject,"references followed more than "+str(maxdepth)+" levels deep"))
+				followlinks=False
+			elif followlinks and len(followedobjects) > linkdepth():
+				addfinding("MaxDepth",(currentobject,"references followed more than "+str(linkdepth())+" levels deep, the limit of the interpreter stack"))
+				followlinks=False
 			if followlinks:
-				foundword = jumptoobject(file,foundword,nword)
+				previousdepth=nestingdepth
+				nestingdepth=depth+1
+				try:
+					foundword = jumptoobject(file,foundword,nword)
+				finally:
+					nestingdepth=previousdepth
 			else:
 				foundword = foundword+' '+nword+' '+nnword
 				vprint(foundword+" ",2,'')
@@ -523,13 +1012,18 @@ def readobject(file,followlinks=False):
 			vprint("[NUM]:",3,'')
 			vprint(foundword+' ',2,'')
 		return foundword
-	elif ord(foundword[0]) == 47: # "/"
-		return getname(file)
-	elif foundword in readobjectdefaultlist:
-		return foundword
 	else:
 		halt("Unexpected end of object, found: "+makeprintable(foundword)+" at: "+hex(file.tell()))
 
+def readobjectas(file,key):
+# reads the object, while keeping track of the indirect object that is being parsed in parsingobject
+	global parsingobject
+	previousobject=parsingobject
+	parsingobject=key
+	value=readobject(file)
+	parsingobject=previousobject
+	return value
+
 def readindirectobject(file):
 # Returns an object or trailer, or the word 'endobj' or 'endstream'. Note that is is also used to scan over the xref table in order to read and return the trailer object. 
 	ppword=""
@@ -542,6 +1036,8 @@ def readindirectobject(file):
 		vprint(foundword,4)
 		if foundword == 'obj':
 			vprint("[OBJ:"+ppword+","+pword+"]",2 , '')
+			if isnum(ppword) and isnum(pword):
+				return readobjectas(file,(num(ppword),num(pword)))
 			return readobject(file)
 		elif foundword =='trailer':
 			vprint("[TRAILER]",2)
@@ -564,17 +1060,187 @@ def isxrefstream(file,pos):
 		return True
 '''
 
+def escapedname(name):
+# Regular expression for a name, also matching names in which characters are written as #xx (like /J#61vaScript), see translatename()
+	expression=b'/'
+	for char in name:
+		hexdigits=b''.join(b'['+bytes([i]).lower()+bytes([i]).upper()+b']' if bytes([i]).isalpha() else bytes([i]) for i in b'%02x' % ord(char))
+		expression+=b'(?:'+re.escape(char.encode())+b'|#'+hexdigits+b')'
+	return expression+rb'(?=[\s/<>\[\]()%{}#]|\Z)' # a # that follows may continue the name; counted as a match anyhow
+
+def triagenames():
+# Returns the regular expression for the risky names, and for ObjStm
+	global triagepattern
+	if triagepattern is None:
+		names=[i[1] or i[0] for i in riskydictionary]+['ObjStm']
+		triagepattern=re.compile(b'|'.join(escapedname(i) for i in names))
+	return triagepattern
+
+def triagenesting(file):
+# Returns whether the document opens more than maxdepth arrays or dictionaries in a row (with only numbers, names and the like in between), which the full parse reports as MaxDepth. All other bytes are removed first, a megabyte at a time, so the search itself only sees the brackets. 
+	global nestingpattern
+	if nestingpattern is None or nestingpattern[0] != maxdepth:
+		nestingpattern=(maxdepth,re.compile(rb'(?:\[|<<){'+str(maxdepth+1).encode()+rb'}'))
+	brackets=b''.join(file.data[i:i+0x100000].translate(None,nestingbytes) for i in range(0,file.size,0x100000))
+	return nestingpattern[1].search(brackets) is not None
+
+def triagedocument(file):
+# Searches the document, and the decoded object streams in it, for the names in riskydictionary in one pass each. Returns the names found; a document without these has no threats to report, so the full parse can be skipped. Anything that can not be checked this way (an object stream that can not be read) is regarded as a candidate, and so is nesting deeper than maxdepth, see triagenesting(). 
+	global silentparse, expandobjstm
+	pattern=triagenames()
+	found=set()
+	objectstreams=[]
+	for match in pattern.finditer(file.data):
+		name=translatename(match.group()[1:].decode('latin-1'))
+		if name == 'ObjStm':
+			objectstreams.append(match.start())
+		else:
+			found.add(name)
+	done=set()
+	for pos in objectstreams:
+		start=None
+		end=pos
+		while start is None and end > 0: # the object the name is in
+			end=file.data.rfind(b'obj',0,end)
+			if end < 0:
+				break
+			objectmatch=objectstart.search(file.data,max(0,end-48),end+3)
+			if objectmatch is not None and objectmatch.end() == end+3:
+				start=objectmatch.start()
+		if start in done:
+			continue
+		done.add(start)
+		previoussilent=silentparse
+		previousexpand=expandobjstm
+		silentparse=True # the object is read again by the full parse, if any
+		expandobjstm=False
+		try:
+			if start is None:
+				raise ValueError("object not found")
+			file.seek(start)
+			value=readindirectobject(file)
+			if not isinstance(value,dict) or not isinstance(value.get("Stream"),PDFStream):
+				halt("Object stream without stream data at: "+hex(start))
+			for match in pattern.finditer(value.get("Stream").data()):
+				name=translatename(match.group()[1:].decode('latin-1'))
+				found.add(name) # including ObjStm, as object streams in object streams are not looked into
+		except (PDFAuditError,)+parsererrors:
+			found.add('ObjStm')
+		finally:
+			silentparse=previoussilent
+			expandobjstm=previousexpand
+	if not found and triagenesting(file): # only needed when the document would not be parsed otherwise
+		found.add('MaxDepth')
+	return found
+
 def getdocumentstructure(file):
 # Based on findobjects (TODO: combine?), scans the complete pdf to retrieve the document structure. Purpose is to find all objects, their locations, being either indirect objects or objects from objectsreams. This is done by just scanning the document from the start. This strategy deviates from the standard strategy from the pdf specification, where the pdf document is supposed to be read from the back to retreive the document structure from (compressed) xref tables. The standard strategy poses problems for malformed pdf files, when references are pointing to incorrect object locations. For these situations a document scan as described above needs to be performed anyhow to continue reading the pdf and not error out. The issue at hand is that some maliciuos pdf's may be altered in such a way, that pdf readers that are able to deal with malformed pdf's might still be able to read these pdf's and pose a risk. Pdfaudit therefore regards it's own constructed document structure as basis  instead of the method described in the pdf specificaton. The penalty however is processing speed, as the document is read twice. 
 # Less relevant, but note that there are basically 3 types of pdf files with respect to cross reference tables. 1) a pdf file with one or more regular xref tables, which are pointed to by startxref at the end of a pdf and the Prev entries in the trailer in case there are more pdf revisions. 2) no xref table but a cross reference stream instead (it has per pdf specification no xref and no trailer section, and startxref points to the cross reference stream). 3) a hybrid version containing both types of xross refence tables.
-	global verbosity
+# In single pass mode, each object is parsed completely as soon as the inventory finds it, and only objects referring to objects not yet found are parsed again afterwards. The inventory itself is not changed by this, to keep the same robustness against malformed pdf's. 
+# The inventory is made either by tokenizing the document (default), or by a regular expression search for the keywords only, see findinventory(). 
+# With --trust-xref the inventory is skipped altogether when the cross reference information of the document checks out, see readxrefchain(). 
+# When resuming from a previous revision of the document, only the appended revision is inventoried, see restorerevision(). 
+# In triage mode, the document is not parsed at all when it does not contain any of the names in riskydictionary, see triagedocument(), unless signatures are searched for. 
+	global inventoryrunning, recordsteps, triageresult
 	if showstructure:
 		vpvalue=1
 	else:
 		vpvalue=2
 	vprint("[GETSTRUCTURE]",2)
+	if triage:
+		found=triagedocument(file)
+		if not found and not signaturelist:
+			vprint("Triage: no risky names found, full parse skipped",0)
+			triageresult='skipped'
+			recordsteps=False # there is no state to resume from
+			showthreats()
+			return
+		elif not found:
+			vprint("Triage: no risky names found, full parse for the signatures",0) # these are only searched by the full parse
+		else:
+			vprint("Triage: found "+", ".join(sorted(found))+", full parse",0)
+		triageresult='parsed'
+	if trustxref and readxrefchain(file):
+		prefetchobjstms(file)
+		iterateobjectlist(file,objstmlist)
+		iterateobjectlist(file,crossreflist)
+		showthreats()
+		return
+	crossreflist.clear()
+	objstmlist.clear()
+	start=1
+	if resumestate is not None:
+		start=restorerevision(resumestate)
+	inventoryrunning=True
+	if inventorymode == 'regex':
+		findinventory(file,vpvalue,start)
+	else:
+		scaninventory(file,vpvalue,start)
+	inventoryrunning=False
+	if resumestate is not None:
+		findredefined(resumestate)
+	if singlepass:
+		iteratependinglist(file)
+	else:
+		prefetchobjstms(file)
+		iterateobjectlist(file,objstmlist) #TODO: some risk here that we start with the wrong objstm, and find a reference to an object in another objstm that is not yet scanned. 
+		shardobjectlist(file)
+		iterateobjectlist(file,crossreflist)
+	showthreats()
+
+def parseobject(file,key):
+# Single pass mode: parses the object right after 'obj' at the current file position. An object that is defined again (new pdf revision) replaces the earlier version and its findings. The file position is restored afterwards, so the inventory continues as usual. 
+	global currentobject
+	startpos=file.tell()
+	if key in scannedobjects or key in replayedobjects:
+		dropobject(key)
+	currentobject=key
+	vprint("[OBJ:"+str(key[0])+","+str(key[1])+"]",2,'')
+	scannedobjects[key]=readobjectas(file,key)
+	objectparsed(key,scannedobjects.get(key))
+	releaseobjstms()
+	file.seek(startpos)
+
+def iteratependinglist(file):
+# Single pass mode: parses the objects with forward references again, now that all object locations are known
+	global currentobject
+	vprint("[PENDING] Number of objects: "+str(len(pendinglist)),2)
+	for i in list(pendinglist):
+		currentobject=i
+		dropobject(i)
+		jumptoobject(file,str(i[0]),str(i[1]))
+		releaseobjstms()
+	pendinglist.clear()
+
+def dropobject(key):
+# forgets a scanned object and its findings, so it can be parsed again
+	value=scannedobjects.pop(key,None)
+	if key in replayedobjects: # evicted from scannedobjects
+		replayedobjects.pop(key)
+		value={"Stream":evictedstreams.pop(key,None)}
+	if isinstance(value,dict) and isinstance(value.get("Stream"),PDFStream):
+		value.get("Stream").uncount()
+	removefindings(key)
+
+def evictobject(key,value):
+# Called when an object is evicted from scannedobjects. The object is still parsed, and is read again from its location when needed, like an object of a replayed step (see readreplayed()). The handle of its stream is kept without the decoded data, so the stream is neither counted again nor lost for dropobject(). 
+	replayedobjects[key]=objstmindex.get(key) if key in objstmindex and key not in crossreflist else None
+	if isinstance(value,dict) and isinstance(value.get("Stream"),PDFStream):
+		value.get("Stream").release()
+		evictedstreams[key]=value.get("Stream")
+
+def removefindings(key):
+# removes the findings that were recorded when scanning the given object
+	for i in list(counttable.keys()):
+		counttable[i]=[j for j in counttable[i] if j[0]!=key]
+		if not counttable[i]:
+			del counttable[i]
+
+def scaninventory(file,vpvalue,start=1):
+# Inventory by tokenizing the complete document from the start, or from the end of a previous revision
+	global inventoryopen
 	filesize=file.seek(-1,2)
-	file.seek(1)
+	file.seek(start)
 	ppword=""
 	pword=""
 	pppos = 0
@@ -582,9 +1248,11 @@ def getdocumentstructure(file):
 	pos = 0
 	foundword="x"
 	while foundword!="": # just scan complete document
-		while nextchar(file) not in "0123456789abcdefghijklmnopqrstuvwxyz":
-#			print(".") #DEBUG
-			file.read(1)
+		match = inventorypattern.search(file.data,file.pos)
+		if match is None:
+			file.pos = file.size
+		else:
+			file.pos = match.start()
 		pppos = ppos
 		ppos = pos
 		pos = file.tell()
@@ -593,56 +1261,182 @@ def getdocumentstructure(file):
 		foundword = getword(file)
 #		print(foundword,"at:",hex(pos),"currentpos at:",hex(file.tell())) #DEBUG
 		if foundword == 'obj':
-			vprint("    "+ppword+" "+pword+" obj at: "+hex(pppos)+" ",vpvalue)
-			crossreflist[num(ppword),num(pword)]=pppos
+			inventoryobject(file,(num(ppword),num(pword)),pppos,vpvalue)
+			length=None
 			while foundword != 'endobj': # TODO: check need to add other delimiters like >, >>, ] 
-				foundword = getword(file)
+				foundword = scanuntil(file,inventorystopwords)
 				if foundword == 'ObjStm':
 					vprint("        has ObjStm",vpvalue)
 					objstmlist[num(ppword),num(pword)]=pppos
+				elif foundword == 'Length':
+					nword, nnword, nnnword = peekwords(file,3)
+					if isnum(nword) and not (isnum(nnword) and nnnword == 'R'):
+						length=intvalue(nword)
+				elif foundword == 'stream' and streamkeyword(file.data,file.data.rfind(b'stream',0,file.pos)):
+					skipstream(file,length,(num(ppword),num(pword)),vpvalue)
+				elif foundword == '': # EOF
+					inventoryopen=True
+					break
 #			print(hex(file.tell())) # DEBUG
-			if verbosity<2:
-				print("inventory: "+str(int(100*pppos/filesize))+"%        ",end='\r')
+			if showprogress and verbosity<2:
+				printprogress("inventory: "+str(int(100*pppos/filesize))+"%        ")
 		elif foundword == 'xref':
 			vprint("xref at: "+hex(pos),vpvalue)
 			# TODO: read xref table, and check if this matches the object locations
 		elif foundword == 'trailer':
-			vprint("trailer at: "+hex(pos),vpvalue)
-			pverbosity=verbosity
-			verbosity=1
-			trailer=readobject(file)
-			if trailer.get("Prev",0) != 0:
-				vprint("    Prev is: "+hex(int(trailer.get("Prev"))),vpvalue)
-			if trailer.get("XRefStm",0) != 0:
-				vprint("    XRefStm is: "+hex(int(trailer.get("XRefStm"))),vpvalue)
-			verbosity=pverbosity
+			inventorytrailer(file,pos,vpvalue)
 		elif foundword == 'startxref':
-			vprint("startxref at: "+hex(pos),vpvalue)
-			startxref=int(getword(file))
-			vprint("    points to: "+hex(startxref),vpvalue)
+			inventorystartxref(file,pos,vpvalue)
+
+def findinventory(file,vpvalue,start=1):
+# Inventory by searching for the keywords of the document structure with one regular expression over the complete file buffer, instead of tokenizing it. The result is the same as that of scaninventory(): inside an object only the end of the object, ObjStm, Length and stream are looked at; stream data is skipped the same way. 
+	global inventoryopen
+	data=file.data
+	pos=start
+	key=None
+	keypos=0
+	length=None
+	while True:
+		match=inventorykeywords.search(data,pos)
+		if match is None:
+			break
+		word=match.group(0)
+		pos=match.end()
+		if match.group(1) is not None:
+			if key is None:
+				key=(int(match.group(1)),int(match.group(2)))
+				keypos=match.start()
+				length=None
+				file.seek(pos)
+				inventoryobject(file,key,keypos,vpvalue)
+		elif key is not None:
+			if word == b'endobj':
+				key=None
+				if showprogress and verbosity<2:
+					printprogress("inventory: "+str(int(100*keypos/file.size))+"%        ")
+			elif word == b'ObjStm':
+				vprint("        has ObjStm",vpvalue)
+				objstmlist[key]=keypos
+			elif word == b'Length':
+				file.seek(pos)
+				nword, nnword, nnnword = peekwords(file,3)
+				if isnum(nword) and not (isnum(nnword) and nnnword == 'R'):
+					length=intvalue(nword)
+			elif word == b'stream' and streamkeyword(data,match.start()):
+				file.seek(pos)
+				if pos < file.size and data[pos] in whitespacelist: # as the tokenizer, include one trailing white-space character
+					file.pos += 1
+				skipstream(file,length,key,vpvalue)
+				pos=file.pos
+		elif word == b'xref':
+			vprint("xref at: "+hex(match.start()),vpvalue)
+		elif word == b'trailer':
+			file.seek(pos)
+			inventorytrailer(file,match.start(),vpvalue)
+			pos=file.pos
+		elif word == b'startxref':
+			file.seek(pos)
+			inventorystartxref(file,match.start(),vpvalue)
+			pos=file.pos
+	inventoryopen=key is not None
+	file.seek(file.size)
+
+def inventoryobject(file,key,pos,vpvalue):
+	vprint("    "+str(key[0])+" "+str(key[1])+" obj at: "+hex(pos)+" ",vpvalue)
+	crossreflist[key]=pos
+	if singlepass:
+		parseobject(file,key)
+
+def inventorytrailer(file,pos,vpvalue):
+	global verbosity
+	vprint("trailer at: "+hex(pos),vpvalue)
+	pverbosity=verbosity
+	verbosity=1
+	trailer=readobject(file)
+	if not isinstance(trailer,dict):
+		verbosity=pverbosity
+		halt("Trailer is not a dictionary at: "+hex(pos))
+	if trailer.get("Prev",0) != 0:
+		vprint("    Prev is: "+hex(int(trailer.get("Prev"))),vpvalue)
+	if trailer.get("XRefStm",0) != 0:
+		vprint("    XRefStm is: "+hex(int(trailer.get("XRefStm"))),vpvalue)
+	verbosity=pverbosity
+
+def inventorystartxref(file,pos,vpvalue):
+	vprint("startxref at: "+hex(pos),vpvalue)
+	startxref=int(getword(file))
+	vprint("    points to: "+hex(startxref),vpvalue)
 # TODO: the next section errors out on malformed pdf's, so commented out; as explained above, we scan the actual pdf from the beginning to locate the object postions anyways. 
-#			if isxrefstream(file,startxref):
-#				vprint("    which is a cross reference stream",2)
-#				currentpos=file.tell()
-#				file.seek(startxref)
-#				pverbosity=verbosity
-#				verbosity=1
-#				getxrefstream(file)
-#				file.seek(currentpos)
-#				verbosity=pverbosity
-#			else:
-#				vprint("    points to xref",2)
-			vprint("EOF or new PDF revision",vpvalue)
-#	print(objstmlist) #DEBUG
-#	print(crossreflist) #DEBUG
-	iterateobjectlist(file,objstmlist) #TODO: some risk here that we start with the wrong objstm, and find a reference to an object in another objstm that is not yet scanned. 
-	iterateobjectlist(file,crossreflist)
-	showthreats()
+#	if isxrefstream(file,startxref):
+#		vprint("    which is a cross reference stream",2)
+#		currentpos=file.tell()
+#		file.seek(startxref)
+#		pverbosity=verbosity
+#		verbosity=1
+#		getxrefstream(file)
+#		file.seek(currentpos)
+#		verbosity=pverbosity
+#	else:
+#		vprint("    points to xref",2)
+	vprint("EOF or new PDF revision",vpvalue)
+
+def findstreamend(file,start):
+# Returns the length of the stream data from start up to the next endstream, without the end of line before it
+	end=file.find(b'endstream',start)
+	if end < 0:
+		end=file.size
+	if end > start and file.data[end-1] == 10:
+		end-=1
+	if end > start and file.data[end-1] == 13:
+		end-=1
+	return end-start
+
+def streamkeyword(data,start):
+# Whether the word stream at start follows the closing >> of the dictionary of the object (apart from white-space), so the stream data starts after it. The word elsewhere in an object, like in a string, is not skipped, so the objects that follow it are not hidden from the inventory. 
+	pos=start
+	while pos > 0 and data[pos-1] in whitespacelist:
+		pos-=1
+	return data[pos-2:pos] == b'>>'
+
+def skipstream(file,length,key,vpvalue):
+# Jumps over the stream data that starts at the current file position, right after the word 'stream'. A direct Length is trusted if 'endstream' follows it, otherwise 'endstream' is searched for. A declared Length that does not match the actual stream length is reported as a structural finding. 
+	data=file.data
+	start=file.pos
+	if data[start-1] == 13 and start < file.size and data[start] == 10: # 'stream\r\n'
+		start+=1
+	if length is not None:
+		end=start+length
+		while end < file.size and data[end] in whitespacelist:
+			end+=1
+		if data[end:end+9] == b'endstream':
+			file.pos=end+9
+			vprint("        stream of "+str(length)+" bytes",vpvalue)
+			return
+	end=file.find(b'endstream',start)
+	if end < 0:
+		end=file.size
+		file.pos=end
+	else:
+		file.pos=end+9
+	if data[end-1] == 10: # EOL before endstream is not part of the stream
+		end-=1
+	if data[end-1] == 13:
+		end-=1
+	end=max(start,end)
+	vprint("        stream of "+str(end-start)+" bytes",vpvalue)
+	if length is not None:
+		vprint("        declared Length: "+str(length)+" differs from actual: "+str(end-start),vpvalue)
+		dictionaryappendlist(structuretable,'Length',(key,"declared "+str(length)+", actual "+str(end-start)))
+
+def threatkeys():
+# The keys of counttable in the order they are reported. Signature findings come last, as these are found when streams are decoded, which may be in the background. 
+	return sorted(counttable, key=lambda i: i == "Signature")
 
 def showthreats():
 #	print(counttable) #DEBUG
+	collectdecoded()
 	print("\nFound threats:")
-	for i in list(counttable.keys()):	
+	for i in threatkeys():	
 		for j in list(counttable.get(i)):
 			objectstring = str(j[0][0])+" "+str(j[0][1])
 			valuestring = j[1]
@@ -650,89 +1444,178 @@ def showthreats():
 				" in object "+objectstring+
 				" (at: "+hex(crossreflist.get(j[0]))+
 				"): "+makeprintable(valuestring))
+	if structuretable:
+		print("\nStructural findings:")
+	for i in list(structuretable.keys()):
+		for j in list(structuretable.get(i)):
+			print("/"+i+
+				" in object "+str(j[0][0])+" "+str(j[0][1])+
+				" (at: "+hex(crossreflist.get(j[0]))+
+				"): "+j[1])
+	vprint("",1)
+	vprint("Streams decoded: "+str(streamstats['decoded'][0])+" ("+str(streamstats['decoded'][1])+" bytes), "+
+		"skipped: "+str(streamstats['skipped'][0])+" ("+str(streamstats['skipped'][1])+" bytes)",1)
+	vprint("Object cache: "+str(scannedobjects.hits)+" hits, "+str(scannedobjects.misses)+" misses, "+str(scannedobjects.evictions)+" evictions"+
+		(", peak "+str(scannedobjects.peak)+" of "+str(scannedobjects.budget)+" bytes" if scannedobjects.budget else ""),1 if scannedobjects.budget else 2)
 
-'''
-def getxref(file):
-# Read the crossreference table, and stores object locations in crossreflist
-	global crossreflist
+def findstartxref(file):
+# Returns the position startxref points to, searching backwards from the end of the file, or None
+	startxrefpos=file.data.rfind(b'startxref')
+	if startxrefpos < 0:
+		return None
+	vprint("[STARTXREF] at: "+hex(startxrefpos),2)
+	file.seek(startxrefpos+9)
+	foundword=getword(file)
+	if not foundword.isdigit():
+		return None
+	return int(foundword)
+
+def getxref(file,xrefentries):
+# Reads the cross reference table at the current file position (right after 'xref'), and returns the trailer following it. Entries are only added to xrefentries if the object number is not in there yet, since newer pdf revisions are read first. 
 	vprint("[XREF]",2)
-	startobj, countobj = getnexttwowords(file)
-	while isnum(startobj) and isnum(countobj):
-		startobj=num(getword(file))
-		countobj=num(getword(file))
-		vprint("number of objects in xref: "+str(countobj),2)
+	data=file.data
+	pos=file.pos
+	match=xrefsubsection.match(data,pos)
+	while match is not None:
+		startobj=int(match.group(1))
+		countobj=int(match.group(2))
 		vprint("[XREF]:"+str(startobj)+" "+str(countobj),2)
+		pos=match.end()
 		for i in range(startobj,startobj+countobj):
-			objectoffset = num(getword(file))
-			objectgen = num(getword(file))
-			objectinuse = getword(file)
-			if objectinuse == 'n':
-				vprint("("+str(i)+" "+str(objectgen)+") at: "+hex(objectoffset),2,'')
-				if crossreflistvfy[i,objectgen]==objectoffset: #TODO: could be possible that we did not find this object
-					crossreflist[i,objectgen]=objectoffset
-					vprint(" (OK) ",2,'')
-				else:
-					crossreflist[i,objectgen]=crossreflistvfy[i,objectgen]
-					vprint(" (NOK) ",2,'')
-				# this either inserts a new key, or updates an existing one.
-
-			else: # 'f'
-				if (i,objectgen) in list(crossreflist.keys()): #should normally be the case
-					del crossreflist[i,objectgen-1] # per pdf spec: generations are incremented by 1
-			vprint(str(i)+str(objectoffset)+str(objectgen)+str(objectinuse),3)
-		startobj, countobj = getnexttwowords(file)
+			entry=xrefentry.match(data,pos)
+			if entry is None:
+				return None
+			pos=entry.end()
+			if i not in xrefentries:
+				if entry.group(3) == b'n':
+					xrefentries[i]=(1,int(entry.group(1)),int(entry.group(2)))
+				else: # 'f'
+					xrefentries[i]=(0,0,0)
+		match=xrefsubsection.match(data,pos)
+	file.seek(pos)
+	if getword(file) != 'trailer':
+		return None
 	vprint("[XREF: End]",2)
+	return readobject(file)
 
-def findstartback(file,startstring):
-# Returns the previous file position of the whole search string
-	filepos = file.tell()
-	foundword = ""
-	while True:
-		filepos -= 1 # TODO: does not check if we're passing the beginning of the file (malformed pdfs can cuse this situation)
-		file.seek(filepos)
-		if file.read(1)[0] in whitespacelist:
-			foundword = getword(file)
-			if foundword == startstring:
-				vprint("[FIND]: "+startstring+" found at: "+hex(filepos+1),3)
-				return filepos+1
-
-def checkxrefpos(file,xrefpos):
-# First checks if the given position starts with "xref", or two numbers (indicating an object). Otherwise searches for 'xref' from the current position as last resort. 
-	currentpos=file.tell()
-	file.seek(xrefpos)
-	word1, word2 = getnexttwowords(file)
-	if word1=='xref' or (isnum(word1) and isnum(word2)):
-		return xrefpos
-	else:
-		file.seek(currentpos)
-		findstartback(file,'xref')
-		realxrefpos=findstartback(file,"xref")
-		vprint("Malformed pdf, incorrect xref position, was: "+hex(xrefpos)+" is: "+hex(realxrefpos),1)
-		return realxrefpos
-
-def getstartxref(file):
-# Searches backwards for "startxref" from the end of the file, and returns the start of "xref"
-# TODO: for linarized PDF's, it seems like the reference in startxref may not only point to an XREF table, but also to an object containing a xrefstream. 
-	file.seek(os.path.getsize(infile) -10) #start reading from the back
-	startxrefpos=findstartback(file,"startxref")
-	vprint("[STARTXREF] at: "+hex(startxrefpos),2)
-	while foundword!='':
-		foundword = getword(file)
-		if isnum(foundword):
-			start=num(foundword)
-	file.seek(startxrefpos)
-	start=checkxrefpos(file,start)
-	vprint("[XREF]: at "+hex(start),2)
-	file.seek(startxrefpos)
-	return start
-'''
+def getxrefstream(file,xrefentries):
+# Reads the cross reference stream object at the current file position, and returns its dictionary. The stream contains rows of W[0]+W[1]+W[2] bytes: the field type, and two fields depending on the type, for the object numbers given by Index. Entries are added to xrefentries like getxref() does. 
+	global silentparse
+	vprint(" ",2)
+	vprint("[XREF Stream]",2,'')
+	previoussilent=silentparse
+	silentparse=True # the object is audited when it is parsed like any other
+	try:
+		xrefdictionary=readindirectobject(file)
+	finally:
+		silentparse=previoussilent
+	if not isinstance(xrefdictionary,dict) or not isinstance(xrefdictionary.get("Stream"),PDFStream):
+		return None
+	stream=xrefdictionary.get("Stream")
+	stream.uncount() # part of reading the document structure, not of the audit
+	data=stream.data() # including the predictor, usually PNG Up
+	stream.release()
+	if not isinstance(xrefdictionary.get("W"),list):
+		halt("Cross reference stream without W array")
+	w=[num(i) for i in xrefdictionary.get("W")]
+	n=sum(w)
+	index=xrefdictionary.get("Index",["0",xrefdictionary.get("Size")])
+	index=[num(i) for i in index]
+	row=0
+	for i in range(0,len(index)-1,2):
+		for objectnumber in range(index[i],index[i]+index[i+1]):
+			if (row+1)*n > len(data):
+				break
+			field=data[row*n:(row+1)*n]
+			row+=1
+			if w[0] == 0:
+				field1=1 # type defaults to 1
+			else:
+				field1=int.from_bytes(field[0:w[0]],'big')
+			field2=int.from_bytes(field[w[0]:w[0]+w[1]],'big') # object offset, or object stream number
+			field3=int.from_bytes(field[w[0]+w[1]:n],'big') # object generation, or index in the object stream
+			if objectnumber not in xrefentries and field1 in (0,1,2):
+				xrefentries[objectnumber]=(field1,field2,field3)
+	vprint("[XREF Stream]: END",2,'')
+	return xrefdictionary
+
+def readxrefchain(file):
+# Builds crossreflist and objstmlist from the cross reference tables and streams, following startxref, Prev and XRefStm, instead of scanning the complete document. This is only done when the cross reference information is trusted (--trust-xref). A random sample of the object positions is checked to start with 'N G obj', and the complete scan done by getdocumentstructure() is used instead on any mismatch or error. Returns True if the cross reference information is used. 
+	xrefentries={}
+	visited=set()
+	try:
+		xrefpos=findstartxref(file)
+		pending=[xrefpos]
+		while pending:
+			xrefpos=pending.pop(0)
+			if xrefpos is None or xrefpos in visited or xrefpos >= file.size:
+				if xrefpos is not None and xrefpos not in visited:
+					vprint("Cross reference position beyond end of file: "+hex(xrefpos),1)
+					return False
+				continue
+			visited.add(xrefpos)
+			vprint("[XREF] at: "+hex(xrefpos),2)
+			file.seek(xrefpos)
+			if getword(file) == 'xref':
+				trailer=getxref(file,xrefentries)
+			else:
+				file.seek(xrefpos)
+				trailer=getxrefstream(file,xrefentries)
+			if not isinstance(trailer,dict):
+				vprint("No cross reference information found at: "+hex(xrefpos),1)
+				return False
+			if trailer.get("XRefStm") is not None: # hybrid file: the xref stream comes right after this table
+				pending.insert(0,num(trailer.get("XRefStm")))
+			if trailer.get("Prev") is not None:
+				pending.append(num(trailer.get("Prev")))
+	except (PDFAuditError,)+parsererrors as error:
+		vprint("Error reading cross reference information: "+str(error),1)
+		return False
+	if not xrefentries:
+		return False
+	positions={}
+	containers=set()
+	for i in xrefentries:
+		field1, field2, field3 = xrefentries.get(i)
+		if field1 == 1:
+			positions[i,field3]=field2
+		elif field1 == 2:
+			containers.add((field2,0))
+	if not verifyxref(file,positions,containers):
+		return False
+	crossreflist.clear()
+	for i in sorted(positions,key=positions.get): # same order as the document scan would find them
+		crossreflist[i]=positions.get(i)
+	objstmlist.clear()
+	for i in crossreflist:
+		if i in containers:
+			objstmlist[i]=crossreflist.get(i)
+	vprint("Using cross reference information: "+str(len(crossreflist))+" objects, "+str(len(objstmlist))+" object streams",2)
+	return True
+
+def verifyxref(file,positions,containers):
+# Checks if a random sample of the object positions, and all object streams, start with the expected 'N G obj'
+	import random
+	sample=random.sample(list(positions),min(xrefsample,len(positions)))
+	for i in containers:
+		if i not in positions:
+			vprint("Object stream not in cross reference information: "+str(i[0])+" "+str(i[1]),1)
+			return False
+		sample.append(i)
+	for i in sample:
+		match=objectheader.match(file.data,positions.get(i))
+		if match is None or (int(match.group(1)),int(match.group(2))) != i:
+			vprint("Cross reference position of object "+str(i[0])+" "+str(i[1])+" is incorrect: "+hex(positions.get(i)),1)
+			return False
+	vprint("[XREF] verified "+str(len(sample))+" object positions",2)
+	return True
 
 def getpdfversion(file):
 	file.seek(0)
 	versionstring=readcomment(file)
 	vprint("PDF version: "+versionstring,2)
 	if "PDF" not in versionstring:
-		halt("Incorrect PDF header, found: "+versionstring)
+		halt("Incorrect PDF header, found: "+versionstring,PDFStructureError)
 
 def iterateobjectlist(file,objectlist):
 #TODO: progress counter
@@ -742,154 +1625,630 @@ def iterateobjectlist(file,objectlist):
 	for i in list(objectlist): #TODO: use currentobject instead of i here? 
 		vprint("[XREFITERCMP]:"+str(i[0])+" "+str(i[1]),2)
 		currentobject=i
-		if verbosity<2:
-			print("progress: "+str(int(100*j/len(objectlist)))+"%, scanning object: "
-				+str(i[0])+" "+str(i[1])+"             ",end='\r')
-		jumptoobject(file,str(i[0]),str(i[1])) # TODO: juggling with num to string to num
+		if showprogress and verbosity<2:
+			printprogress("progress: "+str(int(100*j/len(objectlist)))+"%, scanning object: "
+				+str(i[0])+" "+str(i[1])+"             ")
+		if recordsteps:
+			auditstep(file,i)
+		else:
+			jumptoobject(file,str(i[0]),str(i[1])) # TODO: juggling with num to string to num
+		releaseobjstms()
 		j += 1
-	print("                                                            ",end='\r')
+	if showprogress:
+		printprogress("                                                            ")
 
+def shardobjectlist(file):
+# Parses the objects of crossreflist that are not parsed yet in shards (byte ranges of the document), each in a worker process with its own memory map of the file, see auditshard(). The steps logged by the workers are then replayed by iterateobjectlist() in the order of a serial audit. A step that touched objects of another shard, like a reference to an object that is parsed earlier in the serial order, is not replayable and is executed again, so the findings are the same as those of a serial audit. 
+	global recordsteps
+	if shards <= 1 or shardsource is None or resumestate is not None:
+		return
+	keys=[i for i in crossreflist if i not in scannedobjects and i not in replayedobjects]
+	if len(keys) < 2*shards:
+		return
+	shardlist=[[] for i in range(shards)]
+	for i in keys:
+		shardlist[min(shards-1,crossreflist.get(i)*shards//max(file.size,1))].append(i)
+	state={'crossreflist':list(crossreflist.items()),'objstmlist':list(objstmlist.items()),
+		'objstmindex':list(objstmindex.items()),'streamcontext':list(streamcontext.items()),
+		'parsed':[(i,objstmindex.get(i) if i in objstmindex and i not in crossreflist else None) for i in scannedobjects]+list(replayedobjects.items())}
+	vprint("[SHARDS] objects per shard: "+", ".join(str(len(i)) for i in shardlist),2)
+	import concurrent.futures
+	with concurrent.futures.ProcessPoolExecutor(max_workers=shards) as executor:
+		futures=[executor.submit(auditshard,shardsource[0],shardsource[1],state,i) for i in shardlist if i]
+		for future in futures:
+			try:
+				steps=future.result()
+			except Exception as error: # the objects of this shard are parsed by iterateobjectlist()
+				vprint("[SHARDS] shard failed: "+repr(error),2)
+				continue
+			for step in steps:
+				resumesteps[step['key']]=step
+	recordsteps=True
 
-'''
-def bytesum(b1,b2):
-	bsum=bytearray(len(b1))
-	for i in range(len(b1)):
-		bsum[i]=(b1[i]+b2[i])%256
-	return bsum
-
-def getxrefstream(file):
-# the complete dictionary is retrieved. The stream inside the dicionary contains the crossreference table, which may have have been coded with a predictor. In that case, the predictor is executed on the stream to retrieve the bare stream. First part of this stream is the object list (which consists of N pairs object number and offset from the first object in the stream), which is read, and the last part are the objects references itself. The result is stored in the global crossreflist(comressed) lists, and the indirect objects that contain ObjStm's is returned. 
-	global crossreflist
-	global crossreflistcompressed
-	vprint(" ",2)
-	vprint("[XREF Stream]",2,'')
-	xrefdictionary=readindirectobject(file)
-#	print(xrefdictionary)
-	stream=xrefdictionary.get("Stream")
-	w=xrefdictionary.get("W")
-	w=[num(w[0]), num(w[1]), num(w[2])]
-#	print(w)
-	n=sum(w)
-	predictor=False
-	fieldstart=0
-	if "DecodeParms" in list(xrefdictionary.keys()):
-		if num(xrefdictionary.get("DecodeParms").get("Predictor","0"))>1:
-			predictor=True
-			fieldstart=1
-			vprint("[Predictor]",2,'')
-			n+=1
-	objectlist = [stream[i:i+n] for i in range(0, len(stream), n)] # list comprehension
-	vprint("[XREF Stream objects]: "+xrefdictionary.get("Size"),3)
-	predictorlist=[i[0] for i in objectlist] # list comprehension; get first column
-	fieldlist=[i[fieldstart:n] for i in objectlist] # list comprehension; get rest of the column
-#	print(fieldlist) # DEBUG
-#	print(predictorlist) # DEBUG
-
-	xreflist=[]
-	if predictor:
-		for i in range(len(fieldlist)-1):
-#			print(fieldlist[i]) #DEBUG
-			if predictorlist[i+1]==2:
-				fieldlist[i+1]=bytesum(fieldlist[i],fieldlist[i+1])
-			else:
-				halt("XREF Stream predictor not implemented")
-	for field in list(fieldlist):
-		entry=[]
-		for i in range(len(w)):
-			fstart=sum(w[0:i])
-			fend=sum(w[0:i])+w[i]
-			entry.append(int.from_bytes(field[fstart:fend],byteorder='big', signed=False))
-		xreflist.append(entry)
-
-#	print(xreflist) # DEBUG
-	# TODO: implement reading and using Index (first object number and number of entries), defaults to [0 size]
-	xreflistsize=len(crossreflist)
-	cxreflistsize=len(crossreflistcompressed)
-	ObjStmList=[]
-	for i in range(len(xreflist)): #TODO: this is the same as regular xref handling; combine?
-		field3=xreflist[i][2] # object generation or index 
-		field2=xreflist[i][1] # object number or offset
-		field1=xreflist[i][0] # field type
-		if field1==1: # e.g. 'n'
-			crossreflist[i,field3]=field2
-			# this either inserts a new key, or updates an existing one.
-			vprint("        "+str(i)+" "+str(field3)+ " is at: "+hex(field2),2)
-		elif field1==0: # e.g. 'f'
-			if (i,field3) in list(crossreflist.keys()): #should normally be the case
-				del crossreflist[i,field3-1] # per pdf spec: generations are incremented by 1
-				vprint("        "+str(field2)+" "+str(field3)+" deleted",2)
-		elif field1==2: # compressed objects list
-			# The objects found are not stored here, but when scanning the ObjStm. We need however to store all object nunbers that contain compressed objects, in order to scan these later. 
-			if xreflist[i][1] not in list(ObjStmList):
-				vprint("ObjStm Object found: "+str(field2)+" 0",2)
-				ObjStmList.append(field2)
-				vprint("        "+str(field3)+" 0 is in ObjStm: "+str(field2)+" 0",2)
-				vprint("        "+str(field2)+" 0 has ObjStm",2)
+def auditshard(filename,options,state,keys):
+# Parses the objects of a shard in a worker process, starting from the state after the object streams were expanded (the objects parsed so far are read again when needed, like in readreplayed()). Returns the logs of the steps; the report is made by the main process. 
+	global documentfile, recordsteps, currentobject, showprogress, decodepool, decodepoolsize
+	globals().update(options)
+	decodepool=None # a pool of the parent process has no threads in this one
+	decodepoolsize=0
+	resetstate()
+	showprogress=False
+	for tablename, table in (('crossreflist',crossreflist),('objstmlist',objstmlist),('objstmindex',objstmindex),
+		('streamcontext',streamcontext),('parsed',replayedobjects)):
+		table.update(state.get(tablename))
+	recordsteps=True
+	with contextlib.redirect_stdout(io.StringIO()):
+		documentfile=openpdf(filename)
+		with documentfile:
+			for key in keys:
+				currentobject=key
+				auditstep(documentfile,key)
+			collectdecoded()
+		documentfile=None
+	return revisionsteps
+
+def logstep(kind,key):
+# Records an object in the log of the current step: parsed in this step, or found to be parsed before (hits) or not (misses)
+	if steplog is None or silentparse or key in steplog['seen']:
+		return
+	if kind == 'parsed':
+		steplog['seen'].add(key)
+		steplog['parsed'].append((key,None))
+	else:
+		steplog[kind].append(key)
+
+def auditstep(file,key):
+# One step of iterateobjectlist(), while recording the steps of the audit. An incremental update of a document leaves the objects of the previous revision as they are, so the log of the same step of the previous revision is replayed if it is still valid, see replayable(). Otherwise the object is parsed, and a new log is made of the objects that were parsed and looked up, the findings, and the changes to streamstats, streamcontext and objstmindex. 
+	global steplog
+	if key in scannedobjects or key in replayedobjects: # parsed in an earlier step
+		return
+	step=resumesteps.get(key)
+	if step is not None and replayable(step):
+		replaystep(step)
+		revisionsteps.append(step)
+		return
+	statsbefore=streamstats['decoded']+streamstats['skipped']
+	contextbefore=dict(streamcontext)
+	steplog={'key':key,'parsed':[],'hits':[],'misses':[],'findings':[],'objstm':[],'unsafe':False,'seen':set()}
+	jumptoobject(file,str(key[0]),str(key[1]))
+	collectdecoded() # the step includes the streams it decodes in the background
+	statsafter=streamstats['decoded']+streamstats['skipped']
+	steplog['stats']=[statsafter[i]-statsbefore[i] for i in range(4)]
+	steplog['consumed']=[(i,contextbefore.get(i)) for i in contextbefore if i not in streamcontext]
+	steplog['added']=[(i,streamcontext.get(i)) for i in streamcontext if contextbefore.get(i) != streamcontext.get(i)]
+	del steplog['seen']
+	for i in steplog['objstm']: # objects in object streams that are parsed again may replace objects of the previous revision
+		redefinedobjects.add(i[0])
+	revisionsteps.append(steplog)
+	steplog=None
+
+def replayable(step):
+# Whether the log of a step of the previous revision (or of a shard) is still valid: it parsed the object of the step, none of the objects it read are new or moved, the objects it found to be parsed before (or not) are still the same, and the streams that earlier steps left to be decoded when parsed are the same
+	if step['unsafe'] or not any(i == step['key'] for i, source in step['parsed']): # a step that did not parse its own object has nothing to replay
+		return False
+	consumed={i for i, category in step['consumed']}
+	for i, source in step['parsed']:
+		if i in redefinedobjects or i in scannedobjects or i in replayedobjects:
+			return False
+		if i in streamcontext and i not in consumed:
+			return False
+	for i in step['hits']:
+		if i in redefinedobjects or (i not in scannedobjects and i not in replayedobjects):
+			return False
+	for i in step['misses']:
+		if i in scannedobjects or i in replayedobjects:
+			return False
+	for i, category in step['consumed']:
+		if streamcontext.get(i) != category:
+			return False
+	return True
+
+def replaystep(step):
+# Applies the log of a step of the previous revision to the audit state, without parsing its objects. These are only read again when needed, see readreplayed(). 
+	for i, source in step['parsed']:
+		replayedobjects[i]=source
+	for i, container, offset in step['objstm']:
+		objstmindex[i]=(container,offset)
+	for key, objectkey, value in step['findings']:
+		dictionaryappendlist(counttable,key,(objectkey,value))
+	for i, state in enumerate(['decoded','decoded','skipped','skipped']):
+		streamstats[state][i%2]+=step['stats'][i]
+	for i, category in step['consumed']:
+		streamcontext.pop(i,None)
+	for i, category in step['added']:
+		streamcontext[i]=category
+
+def readreplayed(file,key):
+# Reads an object that was parsed in a replayed step, or evicted from scannedobjects, again, from the same location, without recording findings or stream statistics. Object streams are not expanded, as their objects are known from the replayed steps as well. A stream of the object is counted from then on, as a later step may still decode it. The object is read as the current object, so in single pass mode a forward reference in it does not put the object referring to it in pendinglist. 
+	global silentparse, expandobjstm, currentobject
+	source=replayedobjects.pop(key)
+	stream=evictedstreams.pop(key,None)
+	previoussilent=silentparse
+	previousexpand=expandobjstm
+	previousobject=currentobject
+	silentparse=True
+	expandobjstm=False
+	currentobject=key
+	try:
+		if source is None:
+			jumptoobject(file,str(key[0]),str(key[1]))
 		else:
-			pass
-#			halt("Unexpected type found reading cross reference stream")
-	vprint("[XREF Stream]: END",2,'')
-	return ObjStmList
-'''
+			container, offset = source
+			buffer=getobjstmbuffer(container)
+			startpos=buffer.tell()
+			buffer.seek(offset)
+			scannedobjects[key]=readobject(buffer)
+			buffer.seek(startpos)
+	finally:
+		silentparse=previoussilent
+		expandobjstm=previousexpand
+		currentobject=previousobject
+	value=scannedobjects.get(key)
+	if stream is not None and isinstance(value,dict) and isinstance(value.get("Stream"),PDFStream):
+		value["Stream"]=stream # of the evicted object, as it was counted
+		scannedobjects.resize(key)
+	elif isinstance(value,dict) and isinstance(value.get("Stream"),PDFStream):
+		value.get("Stream").counted=True
+		value.get("Stream").searched=value.get("Stream").decoded is not None # when decoded in the replayed step
 
-'''
-def readpdf(file,xrefpos):
-# Main principle is to first read the trailer and recurse to the previous version of the pdf, then read the xref table, then read all objects from the pdf version we're handling. Note that readindirectobject() is used to find and read the trailer. 
-# Per PDF spec, the Crossreference table and trailer are structured like this:
-# xref
-#   entries with crossreference information 
-# trailer
-#   << dictionary >>
-# startxref
-#   start psotion of xref
-# %%EOF
-	global startobjsearchpos
-	ObjStmList=[]
-	file.seek(xrefpos)
-	dictionary=readindirectobject(file)
-	if dictionary.get("Prev",0) != 0:
-		file.seek(xrefpos-10)
-		previousxrexpos=int(checkxrefpos(file,int(dictionary.get("Prev"))))
-		vprint("[Prevxref]: "+hex(previousxrexpos),2)
-		readpdf(file,previousxrexpos)
-	file.seek(xrefpos)
-	findobjects(file,startobjsearchpos)
-	startobjsearchpos=file.tell()
-	file.seek(xrefpos) # need to get back to the beginning of the xref, since we read trailer
-	#TODO: obfusc...pdf has both Prev and XRefStm
-	if getword(file)=='xref':
-		getxref(file)
-		vprint(list(crossreflist.keys())[0],3)
-	else: # assume to read a cross reference stream
-		ObjStmList=getxrefstream(file)
-	#TODO: XrefStm and possibliity both xref and crossreference stream exist in pdf spec. 
-	iteratecompressedxref(file,ObjStmList)
-	iteratexref(file)
-	vprint("Scanned objects: "+str(len(scannedobjects))
-
-#		+"/"+str(len(xreflist))
-		)
-'''
+def revisionstate(file):
+# Returns the state reached at the end of the document, to resume from when auditing a later revision of it
+	return {'size':file.size,
+		'crossreflist':[(i[0],i[1],crossreflist.get(i)) for i in crossreflist],
+		'objstmlist':[(i[0],i[1],objstmlist.get(i)) for i in objstmlist],
+		'structure':[(i,j[0],j[1]) for i in structuretable for j in structuretable.get(i)],
+		'steps':revisionsteps}
+
+def restorerevision(state):
+# Restores the inventory of the previous revision from its state, and returns the position where the appended revision starts
+	for n, g, pos in state.get('crossreflist'):
+		crossreflist[n,g]=pos
+	for n, g, pos in state.get('objstmlist'):
+		objstmlist[n,g]=pos
+	for key, objectkey, value in state.get('structure'):
+		dictionaryappendlist(structuretable,key,(tuple(objectkey),value))
+	for step in state.get('steps'):
+		step=loadstep(step)
+		resumesteps[step['key']]=step
+	vprint("Resuming from previous revision, appended revision starts at: "+hex(state.get('size')),2)
+	return state.get('size')
+
+def loadstep(step):
+# converts the log of a step as stored in json back to tuples
+	return {'key':tuple(step['key']),
+		'parsed':[(tuple(i),None if source is None else (tuple(source[0]),source[1])) for i, source in step['parsed']],
+		'hits':[tuple(i) for i in step['hits']],
+		'misses':[tuple(i) for i in step['misses']],
+		'findings':[(key,tuple(objectkey) if isinstance(objectkey,list) else objectkey,value) for key, objectkey, value in step['findings']],
+		'objstm':[(tuple(i),tuple(container),offset) for i, container, offset in step['objstm']],
+		'unsafe':step['unsafe'],
+		'stats':step['stats'],
+		'consumed':[(tuple(i),category) for i, category in step['consumed']],
+		'added':[(tuple(i),category) for i, category in step['added']]}
+
+def findredefined(state):
+# Objects that are new or at another position since the previous revision; steps that read these are not replayed
+	for objectlist, previous in ((crossreflist,state.get('crossreflist')),(objstmlist,state.get('objstmlist'))):
+		previous={(n,g):pos for n, g, pos in previous}
+		for i in objectlist:
+			if previous.get(i) != objectlist.get(i):
+				redefinedobjects.add(i)
+	vprint("New or moved objects: "+str(len(redefinedobjects)),2)
+
+
+
+
+def resetstate():
+# Clears the state of the previous document, so a process can audit more than one file
+	global currentobject, parsingobject, documentfile, inventoryrunning, expandobjstm, nestingdepth
+	global recordsteps, steplog, revisionsteps, resumestate, silentparse, inventoryopen, stoppedat, shardsource, triageresult
+	for i in (counttable, crossreflist, objstmlist, crossreflistcompressed, crossreflistvfy, structuretable,
+		scannedobjects, pendinglist, streamcontext, objstmindex, objstmbuffers,
+		resumesteps, redefinedobjects, replayedobjects, decodefutures, evictedstreams, followedobjects):
+		i.clear()
+	scannedobjects.budget=objectcachesize
+	scannedobjects.onevict=evictobject
+	for i in pendingdecodes: # of a document that ended with an error
+		if i.future is not None:
+			i.future.cancel()
+	pendingdecodes.clear()
+	recordsteps=False
+	steplog=None
+	revisionsteps=[]
+	resumestate=None
+	silentparse=False
+	inventoryopen=False
+	stoppedat=None
+	triageresult=None
+	shardsource=None
+	streamstats['decoded']=[0,0]
+	streamstats['skipped']=[0,0]
+	currentobject=''
+	parsingobject=None
+	documentfile=None
+	inventoryrunning=False
+	expandobjstm=True
+	nestingdepth=0
+
+class Findings:
+# Result of an audit. Threats and structural findings are lists of (key, object, position, value), like they are reported by showthreats(). cached tells whether the findings come from the AuditCache. 
+	def __init__(self,source):
+		self.source=source
+		self.threats=[]
+		self.structure=[]
+		self.streams={}
+		self.report=''
+		self.error=None # (exception class, message) if the audit was ended by a PDFAuditError
+		self.stopped=None # (key, object, examined bytes) if the audit was ended in fail fast mode
+		self.triage=None # with triage: 'skipped' if the full parse was skipped, 'parsed' if not
+		self.cached=False
+
+	def __len__(self):
+		return len(self.threats)
+
+	def collect(self):
+	# copies the findings of the document from the global tables
+		collectdecoded()
+		for tablename, table, keys in (("threats",counttable,threatkeys()),("structure",structuretable,list(structuretable))):
+			for i in keys:
+				for j in table.get(i):
+					getattr(self,tablename).append((i,j[0],crossreflist.get(j[0]),j[1]))
+		self.streams={'decoded':list(streamstats['decoded']),'skipped':list(streamstats['skipped'])}
+		self.stopped=stoppedat
+		self.triage=triageresult
+
+	def save(self,report):
+	# returns the findings as json compatible value, to be stored in the AuditCache
+		return {'threats':self.threats,'structure':self.structure,'streams':self.streams,'error':self.error,'stopped':self.stopped,'triage':self.triage,'report':report}
+
+	def load(self,value):
+	# restores the findings from the AuditCache, and returns the report stored with it
+		for tablename in ("threats","structure"):
+			for key, objectkey, position, string in value.get(tablename):
+				if isinstance(objectkey,list):
+					objectkey=tuple(objectkey)
+				getattr(self,tablename).append((key,objectkey,position,string))
+		self.streams=value.get('streams')
+		self.error=value.get('error')
+		self.stopped=value.get('stopped')
+		self.triage=value.get('triage')
+		if self.stopped is not None:
+			self.stopped=(self.stopped[0],tuple(self.stopped[1]),self.stopped[2])
+		self.cached=True
+		return value.get('report')
+
+class TeeOutput:
+# Writes to more than one output, to keep the report of an audit while it is printed
+	def __init__(self,*outputs):
+		self.outputs=outputs
+
+	def write(self,string):
+		for i in self.outputs:
+			i.write(string)
+		return len(string)
+
+	def flush(self):
+		for i in self.outputs:
+			i.flush()
+
+class Auditor:
+# Audits pdf documents within the calling process, without exiting on errors. The options are those of the command line. audit() returns the Findings of a document, or raises PDFAuditError (with the findings so far as its findings attribute). The text report is kept in Findings.report, and is also printed as it goes if capture is False. 
+# An audit works on the module globals of pdfaudit, with the options set in there, and captures the report by redirecting sys.stdout of the whole process. Instances are therefore not thread-safe: audit documents one at a time per process, or in separate processes like the batch mode does. 
+# With an AuditCache, a document that was audited before with the same version and settings is not audited again; the findings and report are taken from the cache. 
+# With shards, the objects of a document given by its path are parsed by that many worker processes, see shardobjectlist(). 
+# With maxdepth, arrays and dictionaries nested deeper than that (including followed references) are reported as a MaxDepth finding, and left out of the parsed objects, see readobject(). 
+# With objectcachesize, the parsed objects are kept within that many bytes; the least recently used are read again when needed, see evictobject(). 
+# With signatures, a list of (name, signature), each decoded stream is searched for the signatures, see searchstream(). 
+# With failfast, the audit ends at the first finding of one of the failfastkeys (default: JavaScript, Launch, OpenAction), and Findings.stopped tells where. Objects are parsed as the inventory finds them (single pass mode), so only the part of the document up to the finding is examined. 
+# With incremental (the default), the state at the end of each audited document is kept in the cache as well. When a document is an earlier revision of the document to audit, with revisions appended to it (incremental update), only the appended part is inventoried, and the objects of the earlier revision that are not affected by the update are not parsed again. This does not apply to single pass mode and --trust-xref. 
+# The parsing functions share the module state, so an audit is done one at a time per process; the state is reset for each document. 
+	def __init__(self,verbosity=1,showstructure=False,singlepass=False,inventorymode='tokens',
+		decodepolicy=None,trustxref=False,xrefsample=16,capture=True,cache=None,incremental=True,spoolsize=None,
+		failfast=False,failfastkeys=None,triage=False,signatures=None,decodethreads=1,shards=1,objectcachesize=0,maxdepth=100):
+		singlepass=singlepass or failfast
+		self.options={'verbosity':verbosity,'showstructure':showstructure,'singlepass':singlepass,
+			'inventorymode':inventorymode,'decodepolicy':list(decodepolicy or defaultdecodepolicy),
+			'trustxref':trustxref,'xrefsample':xrefsample,'maxdepth':maxdepth,'failfast':failfast,
+			'failfastkeys':list(failfastkeys or defaultfailfastkeys),'triage':triage,
+			'signaturelist':[tuple(i) for i in signatures] if signatures else None,'decodethreads':decodethreads,
+			'shards':shards,'objectcachesize':objectcachesize,'showprogress':not capture}
+		self.capture=capture
+		self.cache=cache
+		self.spoolsize=spoolsize # see readpdf()
+		self.incremental=incremental and not singlepass and not trustxref
+		settings=(apversion,sorted((i,self.options.get(i)) for i in self.options if i not in ('showprogress','decodethreads','shards','objectcachesize')),
+			riskydictionary,followlinkslist,streamreferencelist)
+		self.settingskey=hashlib.sha256(repr(settings).encode()).hexdigest()
+
+	def cachekey(self,data):
+	# SHA-256 of the document, combined with the version of pdfaudit and the settings that determine the findings
+		return hashlib.sha256(data).hexdigest()+"-"+self.settingskey
+
+	def findrevision(self,data):
+	# Returns the state of the longest earlier revision of the document that is in the cache. A revision ends after %%EOF and the end of line that follows it, if any; the hash of each possible end is computed incrementally in one pass over the document. 
+		checksum=hashlib.sha256()
+		pos=0
+		keys=[]
+		for match in revisionend.finditer(data):
+			for end in range(match.start()+5,match.end()+1):
+				if end >= len(data):
+					break
+				checksum.update(data[pos:end])
+				pos=end
+				keys.append("revision-"+checksum.copy().hexdigest()+"-"+self.settingskey)
+		if not keys:
+			return None
+		return self.cache.getfirst(keys[::-1])
+
+	def audit(self,source):
+	# source is either the path of a pdf file, its content as bytes, or a binary stream to read it from (like sys.stdin.buffer), which does not need to be seekable
+		global documentfile, progressoutput, recordsteps, resumestate, shardsource
+		globals().update(self.options)
+		resetstate()
+		if isinstance(source,(bytes,bytearray,memoryview)):
+			name="<"+str(len(source))+" bytes>"
+		elif hasattr(source,'read'):
+			name=str(getattr(source,'name','<stream>'))
+		else:
+			name=str(source)
+		findings=Findings(name)
+		report=io.StringIO()
+		if self.capture:
+			output=report
+		else:
+			output=TeeOutput(sys.stdout,report)
+		progressoutput=sys.stdout # progress is shown, but not part of the report
+		key=None
+		completed=False
+		try:
+			with contextlib.redirect_stdout(output):
+				vprint("Scanning: "+name,0)
+				try:
+					if isinstance(source,(bytes,bytearray,memoryview)):
+						documentfile=PDFBuffer(source)
+					elif hasattr(source,'read'):
+						documentfile=readpdf(source,self.spoolsize)
+					else:
+						documentfile=openpdf(source,self.spoolsize)
+						if os.path.isfile(source): # the workers open the file again, which a pipe can not be
+							shardsource=(str(source),self.options)
+					with documentfile:
+						cached=None
+						if self.cache is not None:
+							key=self.cachekey(documentfile.data)
+							cached=self.cache.get(key)
+						if cached is not None:
+							print(findings.load(cached),end='')
+						else:
+							if key is not None and self.incremental:
+								recordsteps=True
+								resumestate=self.findrevision(documentfile.data)
+							getpdfversion(documentfile)
+							try:
+								getdocumentstructure(documentfile)
+							except FailFastStop as stop:
+								stopaudit(documentfile,stop)
+							findings.collect()
+							if key is not None and recordsteps and not inventoryopen and documentfile.data[-16:].rstrip(b'\r\n').endswith(b'%%EOF'):
+								self.cache.put("revision-"+key,revisionstate(documentfile))
+						if findings.error is not None: # the cached audit ended with an error
+							raise auditerrors.get(findings.error[0],PDFAuditError)(findings.error[1])
+				except (PDFAuditError,)+parsererrors as error:
+					if not isinstance(error,PDFAuditError): # the document is malformed in a way the parser does not check for
+						error=PDFSyntaxError("Malformed document: "+type(error).__name__+": "+str(error))
+					if not findings.cached:
+						findings.collect()
+						findings.error=(type(error).__name__,str(error))
+					error.findings=findings
+					completed=True
+					raise error
+				finally:
+					releaseobjstms()
+					documentfile=None
+			completed=True
+		finally:
+			findings.report=report.getvalue()
+			if key is not None and completed and not findings.cached:
+				self.cache.put(key,findings.save(findings.report.split("\n",1)[-1])) # without the line with the file name
+		return findings
+
+def audit(source,**options):
+# Audits a single pdf document given as path or bytes, see Auditor
+	return Auditor(**options).audit(source)
+
+batchauditor = None # Auditor of a batch worker process, see auditbatch()
+
+def startbatchworker(options):
+	global batchauditor
+	batchauditor=Auditor(**dict(options,shards=1)) # files are audited in parallel already
+
+def auditbatchfile(filename):
+# Audits a file in a batch worker process. Returns the status of the audit, the number of threats, the report, and whether the result was cached. An error only ends the audit of this file. 
+	try:
+		findings=batchauditor.audit(filename)
+	except PDFAuditError as error:
+		return "EXIT: "+str(error), len(error.findings), error.findings.report+"EXIT: "+str(error)+"\n", error.findings.cached
+	except OSError as error:
+		return "Error: "+repr(error), 0, "Scanning: "+filename+"\nError: "+repr(error)+"\n", False
+	if findings.stopped is not None:
+		return "stopped at /"+findings.stopped[0], len(findings), findings.report, findings.cached
+	if findings.threats:
+		return "threats", len(findings), findings.report, findings.cached
+	if findings.triage == 'skipped':
+		return "ok, full parse skipped by triage", 0, findings.report, findings.cached
+	return "ok", 0, findings.report, findings.cached
+
+def findfiles(paths, filelist):
+# Returns the files to audit in batch mode: the given files, all files in the given directories (recursively), and the files listed in filelist, one per line
+	filenames=[]
+	if filelist is not None:
+		with open(filelist) as listfile:
+			paths=paths+[line.strip() for line in listfile if line.strip()]
+	for path in paths:
+		if os.path.isdir(path):
+			for root, dirs, files in os.walk(path):
+				dirs.sort()
+				for name in sorted(files):
+					filenames.append(os.path.join(root,name))
+		else:
+			filenames.append(path)
+	return filenames
+
+def printreports(results, printed):
+# Prints the reports that follow the ones already printed, so the reports are in the order of the files regardless of which file is finished first
+	while printed in results:
+		print(results.get(printed)[2])
+		printed+=1
+	return printed
+
+def auditbatch(filenames, options, jobs):
+# Audits the files in a pool of worker processes, largest files first to shorten the total run time. The reports are printed in the order of filenames, followed by a summary with the status of each file. Returns the number of files that could not be audited completely, and the number of files of which the audit was ended in fail fast mode. 
+	import concurrent.futures
+	sizes={}
+	results={}
+	for i, filename in enumerate(filenames):
+		try:
+			sizes[i]=os.path.getsize(filename)
+		except OSError as error:
+			results[i]=("Error: "+repr(error), 0, "Scanning: "+filename+"\nError: "+repr(error)+"\n", False)
+	printed=0
+	with concurrent.futures.ProcessPoolExecutor(max_workers=jobs, initializer=startbatchworker, initargs=(options,)) as executor:
+		futures={}
+		for i in sorted(sizes, key=sizes.get, reverse=True):
+			futures[executor.submit(auditbatchfile, filenames[i])]=i
+		printed=printreports(results,printed)
+		for future in concurrent.futures.as_completed(futures):
+			i=futures.get(future)
+			try:
+				results[i]=future.result()
+			except Exception as error: # the worker process itself failed
+				results[i]=("Error: "+repr(error), 0, "Scanning: "+filenames[i]+"\nError: "+repr(error)+"\n", False)
+			printed=printreports(results,printed)
+	print("\nSummary:")
+	failed=0
+	stopped=0
+	for i, filename in enumerate(filenames):
+		status, threats, report, cached = results.get(i)
+		if status.startswith("stopped"):
+			stopped+=1
+		elif not status.startswith(("ok", "threats")):
+			failed+=1
+		print(filename+": "+status+(" ("+str(threats)+")" if threats else ""))
+	print("Files: "+str(len(filenames))+", with threats: "+str(sum(1 for i in results.values() if i[1]))+", failed: "+str(failed)+
+		(", stopped: "+str(stopped) if options.get('failfast') else ""))
+	if options.get('cache') is not None:
+		print("Cache hits: "+str(sum(1 for i in results.values() if i[3]))+" of "+str(len(filenames)))
+	return failed, stopped
+
+def startupprofile():
+# Measures the import time of pdfaudit, and of the modules imported when first needed, with python -X importtime in a new interpreter
+	import subprocess
+	code="import pdfaudit; "+"; ".join("import "+i for i in lazymodules)
+	result=subprocess.run([sys.executable,'-X','importtime','-c',code],capture_output=True,text=True,
+		cwd=os.path.dirname(os.path.abspath(__file__)))
+	imports=[]
+	for line in result.stderr.splitlines():
+		if not line.startswith("import time:") or "imported package" in line:
+			continue
+		selftime, cumulative, name = line[12:].split("|")
+		imports.append((len(name)-len(name.lstrip())-1, name.strip(), int(cumulative)))
+	startup=sum(i[2] for i in imports if i[0] == 0 and i[1] not in ['pdfaudit']+lazymodules)
+	print("Import time in ms (cumulative), measured with python -X importtime:")
+	print("  interpreter start up: "+format(startup/1000,'.1f'))
+	children=[]
+	for depth, name, cumulative in imports: # the modules imported by a module are listed before it
+		if depth == 2:
+			children.append((cumulative,name))
+		elif depth == 0:
+			if name == 'pdfaudit':
+				print("  pdfaudit: "+format(cumulative/1000,'.1f'))
+				for i in sorted(children,reverse=True):
+					print("    "+i[1]+": "+format(i[0]/1000,'.1f'))
+			elif name in lazymodules:
+				print("  "+name+" (when first needed): "+format(cumulative/1000,'.1f'))
+			children=[]
+	if sys.flags.dont_write_bytecode:
+		print("Note: bytecode is not cached (PYTHONDONTWRITEBYTECODE), so the times include compiling the modules")
+	if result.returncode:
+		print(result.stderr)
 
 def readarguments():
 # note: Parameters starting with - or -- are usually considered optional. All other parameters are positional parameters and as such required by design (like positional function arguments).
+	import argparse
 	parser = argparse.ArgumentParser(description=apdescription,epilog=apepilog,formatter_class=argparse.RawDescriptionHelpFormatter)
-	parser.add_argument('filename', type=str, help="pdf file to be audited")
+	parser.add_argument('filename', type=str, nargs='*', help="pdf file to be audited, or - to read it from stdin. Batch mode is used for more than one file, or for a directory")
 	parser.add_argument('-d', type=int, default=1, help="detail level D of output: 0 minimal, 1 default, 2 detail, 3 debug")
 	parser.add_argument('-s', action='store_true', help="show pdf document structure during when making the inventory")
+	parser.add_argument('--single-pass', action='store_true', help="parse objects while making the inventory, instead of reading the document twice")
+	parser.add_argument('--decode', type=str, default=",".join(decodepolicy), help="comma separated list of streams to decode, by /Type (like ObjStm, XRef, EmbeddedFile) or by the key referring to it (JavaScript, XFA), or 'all'. Objects inside object streams are only audited if ObjStm is included (default: %(default)s)")
+	parser.add_argument('--inventory', choices=['tokens','regex'], default='tokens', help="make the inventory by tokenizing the document (default), or by a regular expression search for its keywords")
+	parser.add_argument('--trust-xref', action='store_true', help="use the cross reference tables and streams of the document instead of scanning it for objects. A sample of the object positions is verified first; the document is scanned anyhow if these are incorrect")
+	parser.add_argument('--xref-sample', type=int, default=xrefsample, help="number of object positions to verify with --trust-xref (default: %(default)s)")
+	parser.add_argument('--max-depth', type=int, default=maxdepth, help="maximum nesting of arrays, dictionaries and followed references; deeper objects are reported, and left out of the objects they are in. Followed references are also limited by the Python stack (default: %(default)s)")
+	parser.add_argument('--fail-fast', action='store_true', help="end the audit at the first finding of one of the --fail-fast-keys, with exit code "+str(failfastexit)+". Implies --single-pass")
+	parser.add_argument('--fail-fast-keys', type=str, default=",".join(defaultfailfastkeys), help="comma separated list of keys that end the audit with --fail-fast (default: %(default)s)")
+	parser.add_argument('--triage', action='store_true', help="search the document and its object streams for the risky names first, and only parse documents in which these are found")
+	parser.add_argument('--signatures', type=str, help="file with signatures to search for in decoded streams, one per line as 'name: signature'. ? matches any byte, \\xNN is a byte in hexadecimal. Use with --decode to choose the streams")
+	parser.add_argument('--decode-threads', type=int, default=1, help="number of threads decoding streams in the background while parsing goes on. The report is the same for any number (default: %(default)s)")
+	parser.add_argument('--shards', type=int, default=1, help="number of worker processes parsing the objects of a single (large) document, each a byte range of it. The findings are the same as with one (default: %(default)s)")
+	parser.add_argument('--object-cache', type=int, default=0, help="memory budget in MB for the parsed objects of a document; the least recently used are evicted, and read again from the document when needed. 0 keeps all of them (default: %(default)s)")
+	parser.add_argument('--filelist', type=str, help="batch mode: file with the paths of the pdf files to be audited, one per line")
+	parser.add_argument('--jobs', type=int, default=os.cpu_count(), help="batch mode: number of worker processes (default: %(default)s)")
+	parser.add_argument('--cache', type=str, help="sqlite database in which audit results are kept, keyed by the SHA-256 of the file and the settings. Files that were audited before are not audited again")
+	parser.add_argument('--cache-size', type=int, default=256, help="maximum size of the cache in MB; the least recently used results are removed first (default: %(default)s)")
+	parser.add_argument('--spool-size', type=int, default=64, help="input from stdin or a pipe larger than this size in MB is spooled to a temporary file instead of memory (default: %(default)s)")
+	parser.add_argument('--startup-profile', action='store_true', help="show the time spent importing pdfaudit and the modules it uses, and exit")
 	parser.add_argument('-v', action='version', help='show version', version=apversion)
 	parser.add_argument('-w', action='version', help='show warranty', version=apwarranty)
 	parser.add_argument('-c', action='version', help='show copyright', version=apcopyright)
 	args = parser.parse_args()
-	if os.path.isfile(args.filename):
-		return args.filename, args.d, args.s
-	else:
-		halt("File not found")
-
-infile, verbosity, showstructure = readarguments()
-vprint("Scanning: "+infile,0)
-with open(infile, 'rb') as file:
-	getpdfversion(file)
-	getdocumentstructure(file)
+	if args.startup_profile:
+		startupprofile()
+		parser.exit()
+	if not args.filename and args.filelist is None:
+		parser.error("no pdf file given")
+	if '-' in args.filename and (len(args.filename) > 1 or args.filelist is not None):
+		parser.error("stdin (-) can not be used in batch mode")
+	if len(args.filename) == 1 and args.filelist is None and args.filename[0] != '-' and not os.path.exists(args.filename[0]):
+		halt("File not found",PDFAuditError)
+	options={'verbosity':args.d,'showstructure':args.s,'singlepass':args.single_pass,'inventorymode':args.inventory,
+		'decodepolicy':args.decode.split(','),'trustxref':args.trust_xref,'xrefsample':args.xref_sample,'maxdepth':args.max_depth,
+		'spoolsize':args.spool_size*1024*1024,'failfast':args.fail_fast,'failfastkeys':args.fail_fast_keys.split(','),'triage':args.triage,'decodethreads':args.decode_threads,'shards':args.shards,
+		'objectcachesize':args.object_cache*1024*1024}
+	if args.signatures is not None:
+		from signatures import readsignatures, SignatureSet
+		try:
+			options['signatures']=readsignatures(args.signatures)
+			SignatureSet(options['signatures'])
+		except (OSError, ValueError) as error:
+			parser.error("signatures: "+str(error))
+	if args.cache is not None:
+		from auditcache import AuditCache
+		options['cache']=AuditCache(args.cache,args.cache_size*1024*1024)
+	return args.filename, options, args.filelist, args.jobs
 
+def main():
+# Command line interface: audits a single file with its report printed as it goes, or runs a batch
+	try:
+		paths, options, filelist, jobs = readarguments()
+		if len(paths) == 1 and filelist is None and not os.path.isdir(paths[0]):
+			if paths[0] == '-':
+				findings=Auditor(capture=False,**options).audit(sys.stdin.buffer)
+			else:
+				findings=Auditor(capture=False,**options).audit(paths[0]) # pipes, like <(command), are read like stdin
+			if options.get('cache') is not None:
+				vprint("Cache: "+("hit" if findings.cached else "miss")+", totals: "+
+					", ".join(i+" "+str(j) for i, j in sorted(options.get('cache').stats().items())),2)
+			if findings.stopped is not None:
+				sys.exit(failfastexit)
+		else:
+			failed, stopped = auditbatch(findfiles(paths,filelist),options,jobs)
+			if failed:
+				sys.exit(1)
+			if stopped:
+				sys.exit(failfastexit)
+	except PDFAuditError as error:
+		sys.exit("EXIT: "+str(error))
 
+if __name__ == "__main__": # importing pdfaudit does not start an audit; worker processes in batch mode import it as well
+	main()
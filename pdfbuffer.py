@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+#
+#    pdfaudit is a pdf auditing tool for security and privacy
+#    Copyright (C) 2020  Joseph Heller, http://github.com/catch22eu/
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+import os							# to tell regular files from pipes
+import stat
+import mmap							# zero-copy access to the pdf file
+from collections import deque		# lookahead buffer of the lexer
+
+spoolsize = 64*1024*1024 # non-seekable inputs larger than this are spooled to a temporary file instead of memory
+spoolchunk = 1024*1024 # read size for non-seekable inputs
+
+class PDFBuffer:
+# Random access buffer on which all parsing functions operate by offset. The buffer is either a read-only memory map of the pdf file, or plain bytes for inputs that can not be mapped (empty files, pipes, decoded streams). Offsets are python integers, so files larger than 4GB are handled as long as the platform is able to map them (64 bit). For compatibility the buffer also offers read(), seek() and tell() like a file object does.
+
+	def __init__(self, data, mapped=None):
+		self.data = data
+		self.mapped = mapped
+		self.view = memoryview(data)
+		self.size = len(data)
+		self.pos = 0
+		self.lookahead = deque() # tokens scanned ahead by the lexer, see peekwords()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def __len__(self):
+		return self.size
+
+	def read(self, length=-1):
+		start = self.pos
+		if length < 0:
+			self.pos = self.size
+		else:
+			self.pos = min(start+length, self.size)
+		return self.data[start:self.pos]
+
+	def slice(self, length):
+	# same as read(), but returns a zero-copy memoryview on the buffer
+		start = self.pos
+		self.pos = min(start+length, self.size)
+		return self.view[start:self.pos]
+
+	def seek(self, offset, whence=0):
+		if whence == 1:
+			offset += self.pos
+		elif whence == 2:
+			offset += self.size
+		self.pos = max(0, offset)
+		return self.pos
+
+	def tell(self):
+		return self.pos
+
+	def find(self, sub, start=None, end=None):
+		if start is None:
+			start = self.pos
+		if end is None:
+			end = self.size
+		return self.data.find(sub, start, end)
+
+	def close(self):
+		self.view.release()
+		if self.mapped is not None:
+			try:
+				self.mapped.close()
+			except BufferError:
+				pass # slices of the map are still in use; the map is closed when these are garbage collected
+
+def openpdf(filename, limit=None):
+# Maps the file in memory, or falls back to reading it completely in case it can not be mapped. Pipes and other files that are not regular files are read like a stream, see readpdf(), with limit as its spool size. 
+	with open(filename, 'rb') as file:
+		if not stat.S_ISREG(os.fstat(file.fileno()).st_mode):
+			return readpdf(file, limit)
+		try:
+			mapped = mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ)
+		except (ValueError, OSError):
+			return PDFBuffer(file.read())
+	return PDFBuffer(mapped, mapped)
+
+def readpdf(stream, limit=None):
+# Reads a pdf from a stream that can not be seeked, like stdin or a pipe, in one pass. Up to limit bytes (default: spoolsize) the content is kept in memory; the rest of a larger input is spooled to an (already deleted) temporary file, which is then memory mapped. The buffer is the same as for a file on disk, so the parser can seek as usual. 
+	if limit is None:
+		limit = spoolsize
+	data = bytearray()
+	while len(data) <= limit:
+		chunk = stream.read(spoolchunk)
+		if not chunk:
+			return PDFBuffer(bytes(data))
+		data += chunk
+	import tempfile # spooling of large non-seekable inputs; imported when needed, as it imports random
+	with tempfile.TemporaryFile() as spool:
+		spool.write(data)
+		del data
+		while True:
+			chunk = stream.read(spoolchunk)
+			if not chunk:
+				break
+			spool.write(chunk)
+		spool.flush()
+		mapped = mmap.mmap(spool.fileno(), 0, access=mmap.ACCESS_READ)
+	return PDFBuffer(mapped, mapped)
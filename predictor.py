@@ -0,0 +1,172 @@
+#!/usr/bin/env python3
+#
+#    pdfaudit is a pdf auditing tool for security and privacy
+#    Copyright (C) 2020  Joseph Heller, http://github.com/catch22eu/
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import sys							# for the byte order of array
+from array import array				# bulk conversion of running sums to bytes
+from itertools import accumulate	# running sums without a python loop per byte
+import re							# for finding runs of rows with the same filter type
+try:
+	import numpy					# optional, used for runs of PNG Up rows
+except ImportError:
+	numpy = None
+
+# Predictors reverse the differences stored by the encoder, see 7.4.4.4 of the pdf specification. Rows are processed with bulk operations where the predictor allows it: a run of PNG Up rows is a running sum per column, and PNG Sub and TIFF rows are a running sum per color component. Average and Paeth depend on the decoded byte to the left and the byte above, and are decoded byte by byte. 
+
+samebytes = re.compile(rb'(.)\1*', re.S)
+
+def applypredictor(data, predictor=1, colors=1, bitspercomponent=8, columns=1):
+# Returns the data with the predictor reversed. Predictor 2 is TIFF, 10 to 15 are PNG (the filter type is given per row, so these are all decoded the same). An incomplete last row is dropped. 
+	if predictor == 1:
+		return bytes(data)
+	bitsperpixel = colors*bitspercomponent
+	rowlength = (bitsperpixel*columns+7)//8
+	if predictor == 2:
+		return tiffdecode(data, colors, bitspercomponent, rowlength)
+	if 10 <= predictor <= 15:
+		return pngdecode(data, max(1, bitsperpixel//8), rowlength)
+	raise ValueError("Predictor not implemented: "+str(predictor))
+
+def runningsum(data):
+# Running sum of the bytes, modulo 256. Sums are collected in 64 bit integers, of which only the lowest byte is kept. 
+	sums = array('Q', accumulate(data)).tobytes()
+	if sys.byteorder == 'little':
+		return sums[0::8]
+	return sums[7::8]
+
+def tiffdecode(data, colors, bitspercomponent, rowlength):
+# TIFF predictor 2: each component is added to the same component of the pixel to the left
+	output = bytearray(data[:len(data)-len(data)%rowlength])
+	for start in range(0, len(output), rowlength):
+		end = start+rowlength
+		if bitspercomponent == 8:
+			for i in range(colors):
+				output[start+i:end:colors] = runningsum(output[start+i:end:colors])
+		elif bitspercomponent == 16:
+			row = array('H', output[start:end])
+			if sys.byteorder == 'little':
+				row.byteswap() # components are big endian
+			for i in range(colors):
+				row[i::colors] = array('H', map((0xffff).__and__, accumulate(row[i::colors])))
+			if sys.byteorder == 'little':
+				row.byteswap()
+			output[start:end] = row.tobytes()
+		else: # 1, 2 or 4 bits per component
+			output[start:end] = tiffdecodebits(output[start:end], colors, bitspercomponent)
+	return bytes(output)
+
+def tiffdecodebits(row, colors, bitspercomponent):
+# TIFF predictor 2 for components smaller than a byte
+	mask = (1 << bitspercomponent)-1
+	count = len(row)*8//bitspercomponent
+	shift = len(row)*8
+	value = int.from_bytes(row, 'big')
+	components = [(value >> (shift-(i+1)*bitspercomponent)) & mask for i in range(count)]
+	for i in range(colors, count):
+		components[i] = (components[i]+components[i-colors]) & mask
+	value = 0
+	for component in components:
+		value = (value << bitspercomponent) | component
+	return value.to_bytes(len(row), 'big')
+
+def pngdecode(data, bytesperpixel, rowlength):
+# PNG predictors: each row starts with its filter type byte. Consecutive rows of the same type are decoded together. 
+	stride = rowlength+1
+	count = len(data)//stride
+	output = bytearray(count*rowlength)
+	previous = bytes(rowlength)
+	for run in samebytes.finditer(data[0:count*stride:stride]):
+		row, end = run.span()
+		filtertype = run.group()[0]
+		if filtertype == 0: # None
+			for i in range(row, end):
+				output[i*rowlength:(i+1)*rowlength] = data[i*stride+1:(i+1)*stride]
+		elif filtertype == 1: # Sub
+			for i in range(row, end):
+				output[i*rowlength:(i+1)*rowlength] = pngsub(data[i*stride+1:(i+1)*stride], bytesperpixel)
+		elif filtertype == 2: # Up
+			output[row*rowlength:end*rowlength] = pngup(data, row*stride, end-row, rowlength, previous)
+		elif filtertype == 3: # Average
+			for i in range(row, end):
+				previous = pngaverage(data[i*stride+1:(i+1)*stride], previous, bytesperpixel)
+				output[i*rowlength:(i+1)*rowlength] = previous
+		elif filtertype == 4: # Paeth
+			for i in range(row, end):
+				previous = pngpaeth(data[i*stride+1:(i+1)*stride], previous, bytesperpixel)
+				output[i*rowlength:(i+1)*rowlength] = previous
+		else:
+			raise ValueError("PNG filter type not implemented: "+str(filtertype))
+		previous = output[(end-1)*rowlength:end*rowlength]
+	return bytes(output)
+
+def pngsub(row, bytesperpixel):
+# each byte is added to the decoded byte one pixel to the left
+	output = bytearray(row)
+	for i in range(bytesperpixel):
+		output[i::bytesperpixel] = runningsum(row[i::bytesperpixel])
+	return output
+
+def pngup(data, start, count, rowlength, previous):
+# A run of Up rows: each byte is the sum of the bytes in the same column, starting with the row above the run
+	stride = rowlength+1
+	if numpy is not None:
+		rows = numpy.frombuffer(data, dtype=numpy.uint8, count=count*stride, offset=start).reshape(count, stride)[:,1:]
+		rows = rows.cumsum(axis=0, dtype=numpy.uint8)
+		rows += numpy.frombuffer(bytes(previous), dtype=numpy.uint8)
+		return rows.tobytes()
+	output = bytearray(count*rowlength)
+	end = start+count*stride
+	for i in range(rowlength):
+		output[i::rowlength] = runningsum(data[start+1+i:end:stride]).translate(addtable(previous[i]))
+	return output
+
+def addtable(n):
+# translation table for bytes.translate() that adds n to each byte
+	return bytes(range(n,256))+bytes(range(n))
+
+def pngaverage(row, previous, bytesperpixel):
+# each byte is added to the average of the decoded byte to the left and the byte above
+	output = bytearray(row)
+	for i in range(len(row)):
+		left = output[i-bytesperpixel] if i >= bytesperpixel else 0
+		output[i] = (output[i]+((left+previous[i]) >> 1)) & 0xff
+	return output
+
+def pngpaeth(row, previous, bytesperpixel):
+# each byte is added to whichever of left, above and upper left is closest to left + above - upper left
+	output = bytearray(row)
+	for i in range(len(row)):
+		if i >= bytesperpixel:
+			left = output[i-bytesperpixel]
+			upperleft = previous[i-bytesperpixel]
+		else:
+			left = upperleft = 0
+		above = previous[i]
+		estimate = left+above-upperleft
+		distanceleft = abs(estimate-left)
+		distanceabove = abs(estimate-above)
+		distanceupperleft = abs(estimate-upperleft)
+		if distanceleft <= distanceabove and distanceleft <= distanceupperleft:
+			nearest = left
+		elif distanceabove <= distanceupperleft:
+			nearest = above
+		else:
+			nearest = upperleft
+		output[i] = (output[i]+nearest) & 0xff
+	return output
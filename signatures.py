@@ -0,0 +1,148 @@
+#!/usr/bin/env python3
+#
+#    pdfaudit is a pdf auditing tool for security and privacy
+#    Copyright (C) 2020  Joseph Heller, http://github.com/catch22eu/
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+
+import re							# skipping to the next possible match, and checking wildcards
+
+# Signatures are searched with an Aho-Corasick automaton, so the data is read once regardless of the number of signatures. Each signature is added to the automaton by its longest part without wildcards (the anchor); when the anchor is found, the complete signature is checked at that position. While the automaton is in its start state, a regular expression skips to the next byte that can start an anchor, so data without any candidates is passed over without a python loop per byte. 
+# A signature is a byte string in which ? matches any single byte. \? and \\ are a literal ? and \, and \xNN is the byte with hexadecimal value NN, for instance \x90\x90\x90\x90\x90\x90\x90\x90 for a NOP sled. 
+
+escapes = re.compile(rb'\\x([0-9a-fA-F]{2})|\\(.)|(\?)|(.)', re.S)
+
+def parsesignature(text):
+# Returns the bytes of the signature, with None for each wildcard
+	if isinstance(text, str):
+		text = text.encode('latin-1')
+	pattern = []
+	for match in escapes.finditer(text):
+		hexvalue, escaped, wildcard, literal = match.groups()
+		if hexvalue is not None:
+			pattern.append(int(hexvalue, 16))
+		elif escaped is not None:
+			pattern.append(escaped[0])
+		elif wildcard is not None:
+			pattern.append(None)
+		else:
+			pattern.append(literal[0])
+	return pattern
+
+def readsignatures(filename):
+# Reads signatures from a file, one per line as 'name: signature' or just the signature, which is then its own name. Empty lines and lines starting with # are skipped. 
+	signatures = []
+	with open(filename, 'rb') as file:
+		for line in file:
+			line = line.rstrip(b'\r\n')
+			if not line.strip() or line.startswith(b'#'):
+				continue
+			name, separator, text = line.partition(b': ')
+			if not separator:
+				name, text = line, line
+			signatures.append((name.decode('latin-1').strip(), text.decode('latin-1')))
+	return signatures
+
+class SignatureSet:
+# Compiled set of signatures, given as a list of (name, signature). search() returns the signatures found in the data, with the offset of the first match and the number of matches. 
+
+	def __init__(self, signatures):
+		self.source = signatures
+		self.names = []
+		self.checks = [] # the complete signature (compiled to a regular expression when first needed, None without wildcards), the offset of its anchor in it, and the length of the anchor
+		self.goto = [{}] # transitions of each state of the automaton by byte
+		self.fail = [0]
+		self.output = [[]] # signatures whose anchor ends in this state
+		for name, text in signatures:
+			pattern = parsesignature(text)
+			anchor, offset = self.findanchor(pattern)
+			if not anchor:
+				raise ValueError("Signature without any fixed bytes: "+name)
+			self.names.append(name)
+			self.checks.append([pattern if len(anchor) < len(pattern) else None, offset, len(anchor)])
+			self.addanchor(anchor, len(self.names)-1)
+		self.buildfail()
+		firstbytes = b''.join(re.escape(bytes([i])) for i in sorted(self.goto[0]))
+		self.skip = re.compile(b'[' + firstbytes + b']') if firstbytes else None
+
+	def findanchor(self, pattern):
+	# the longest run of bytes without wildcards, and its offset in the pattern
+		anchor, offset = [], 0
+		start = 0
+		for i in range(len(pattern)+1):
+			if i == len(pattern) or pattern[i] is None:
+				if i-start > len(anchor):
+					anchor, offset = pattern[start:i], start
+				start = i+1
+		return anchor, offset
+
+	def addanchor(self, anchor, index):
+		state = 0
+		for byte in anchor:
+			if byte not in self.goto[state]:
+				self.goto.append({})
+				self.fail.append(0)
+				self.output.append([])
+				self.goto[state][byte] = len(self.goto)-1
+			state = self.goto[state][byte]
+		self.output[state].append(index)
+
+	def buildfail(self):
+	# Breadth first, the failure state of each state is the longest proper suffix of it that is in the automaton. The output of that state is added, so a match of an anchor that is a suffix of another one is not missed. 
+		queue = list(self.goto[0].values())
+		for state in queue: # the queue grows while iterating
+			for byte, nextstate in self.goto[state].items():
+				queue.append(nextstate)
+				fail = self.fail[state]
+				while fail and byte not in self.goto[fail]:
+					fail = self.fail[fail]
+				self.fail[nextstate] = self.goto[fail].get(byte, 0)
+				self.output[nextstate] = self.output[nextstate] + self.output[self.fail[nextstate]]
+
+	def search(self, data):
+	# Returns {name: [offset of the first match, number of matches]}
+		found = {}
+		if self.skip is None:
+			return found
+		goto, fail, output, checks = self.goto, self.fail, self.output, self.checks
+		state = 0
+		pos = 0
+		size = len(data)
+		while pos < size:
+			if state == 0:
+				match = self.skip.search(data, pos)
+				if match is None:
+					break
+				pos = match.start()
+			byte = data[pos]
+			while state and byte not in goto[state]:
+				state = fail[state]
+			state = goto[state].get(byte, 0)
+			for index in output[state]:
+				expression, offset, length = checks[index]
+				start = pos+1-length-offset
+				if expression is not None:
+					if isinstance(expression, list):
+						expression = checks[index][0] = re.compile(b''.join(b'.' if i is None else re.escape(bytes([i])) for i in expression), re.S)
+					if start < 0 or not expression.match(data, start):
+						continue
+				name = self.names[index]
+				if name in found:
+					found[name][1] += 1
+				else:
+					found[name] = [start, 1]
+			pos += 1
+		return found
@@ -0,0 +1,134 @@
+#!/usr/bin/env python3
+#
+#    pdfaudit is a pdf auditing tool for security and privacy
+#    Copyright (C) 2020  Joseph Heller, http://github.com/catch22eu/
+#
+#    This program is free software: you can redistribute it and/or modify
+#    it under the terms of the GNU General Public License as published by
+#    the Free Software Foundation, either version 3 of the License, or
+#    (at your option) any later version.
+#
+#    This program is distributed in the hope that it will be useful,
+#    but WITHOUT ANY WARRANTY; without even the implied warranty of
+#    MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+#    GNU General Public License for more details.
+#
+#    You should have received a copy of the GNU General Public License
+#    along with this program.  If not, see <https://www.gnu.org/licenses/>.
+#
+
+# Test cases of the audit, on small documents that are made by the tests themselves
+
+import os
+import sys
+import random
+import zlib
+import tempfile
+import subprocess
+import unittest
+import pdfaudit
+
+here=os.path.dirname(os.path.abspath(__file__))
+
+def makepdf(objects,base=b''):
+# Returns a document with the objects, a list of (object number, body), appended to base as a revision
+	out=bytearray(base or b'%PDF-1.7\n%\xe2\xe3\xcf\xd3\n')
+	offsets={}
+	for number, body in objects:
+		offsets[number]=len(out)
+		out+=b'%d 0 obj\n' % number+body+b'\nendobj\n'
+	xref=len(out)
+	out+=b'xref\n'
+	for number in sorted(offsets):
+		out+=b'%d 1\n%010d 00000 n \n' % (number,offsets[number])
+	out+=b'trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n' % (max(offsets)+1,xref)
+	return bytes(out)
+
+def makestream(data,extra=b''):
+# Returns the body of a flate compressed stream object
+	data=zlib.compress(data)
+	return b'<< '+extra+b'/Filter /FlateDecode /Length %d >>\nstream\n' % len(data)+data+b'\nendstream'
+
+def makeobjstm(objects):
+# Returns the body of an object stream with the objects, a list of (object number, body)
+	header=b''
+	body=b''
+	for number, data in objects:
+		header+=b'%d %d ' % (number,len(body))
+		body+=data+b'\n'
+	return makestream(header+body,b'/Type /ObjStm /N %d /First %d ' % (len(objects),len(header)))
+
+def objstmpdf():
+# A document with objects in object streams, and enough other objects with streams to shard
+	objects=[(1,b'<< /Type /Catalog /Pages 2 0 R /OpenAction 20 0 R >>'),(2,b'<< /Type /Pages /Kids [] /Count 0 >>')]
+	objects+=[(i,makestream(random.Random(i).randbytes(2000),b'/Type /EmbeddedFile ')) for i in range(3,11)]
+	objects.append((11,makeobjstm([(20,b'<< /S /JavaScript /JS (app.alert\\(1\\)) >>'),(21,b'<< /S /URI /URI (http://example.com) >>')])))
+	objects.append((12,makeobjstm([(22,b'<< /S /Launch /F (cmd.exe) >>')])))
+	return makepdf(objects)
+
+class TestAudit(unittest.TestCase):
+
+	def setUp(self):
+		self.files=[]
+
+	def tearDown(self):
+		for i in self.files:
+			os.unlink(i)
+
+	def writepdf(self,data):
+		with tempfile.NamedTemporaryFile(suffix='.pdf',delete=False) as file:
+			file.write(data)
+		self.files.append(file.name)
+		return file.name
+
+	def threats(self,filename,*options):
+	# the findings reported by pdfaudit.py, run in its own process so a hanging audit fails the test
+		result=subprocess.run([sys.executable,os.path.join(here,'pdfaudit.py'),'-d','0']+list(options)+[filename],
+			capture_output=True,timeout=120)
+		report=result.stdout.decode('latin-1').replace('\r','\n')
+		self.assertIn('Found threats:',report)
+		return [i for i in report.split('Found threats:')[1].splitlines() if i.startswith('/')]
+
+	def test_shards_decodethreads(self):
+		filename=self.writepdf(objstmpdf())
+		serial=self.threats(filename)
+		self.assertTrue(any(i.startswith('/JavaScript') for i in serial))
+		self.assertEqual(self.threats(filename,'--shards','2','--decode-threads','3'),serial)
+
+	def test_singlepass_redefined_evicted(self):
+		# object 3 is evicted from the object cache before the second revision defines it again
+		objects=[(1,b'<< /Type /Catalog /Pages 2 0 R >>'),(2,b'<< /Type /Pages /Kids [] /Count 0 >>'),(3,b'<< /S /JavaScript /JS (old) >>')]
+		objects+=[(i,b'<< /Index [%s] >>' % b' '.join(b'%d' % j for j in range(50))) for i in range(4,40)]
+		data=makepdf([(3,b'<< /S /JavaScript /JS (new) >>')],makepdf(objects))
+		threats=pdfaudit.Auditor(singlepass=True).audit(data).threats
+		self.assertEqual([i[3] for i in threats],['new'])
+		self.assertEqual(pdfaudit.Auditor(singlepass=True,objectcachesize=500).audit(data).threats,threats)
+
+	def test_signatures_decodethreads(self):
+		# the object stream is decoded right away, the stream before it in the background
+		objects=[(1,makestream(b'x=eval(y)',b'/Type /EmbeddedFile ')),(2,makeobjstm([(20,b'<< /A (eval(z)) >>')])),(3,b'<< /Type /Catalog >>')]
+		data=makepdf(objects)
+		for singlepass in (False,True):
+			options={'singlepass':singlepass,'signatures':[('eval','eval(')],'decodepolicy':['all']}
+			serial=pdfaudit.Auditor(**options).audit(data).threats
+			self.assertEqual(len(serial),2)
+			self.assertEqual(pdfaudit.Auditor(decodethreads=4,**options).audit(data).threats,serial)
+
+	def test_embeddedfile_without_type(self):
+		# the stream is only known to be an embedded file by the /EF dictionary referring to it, before or after it
+		filespec=b'<< /Type /Filespec /F (a.js) /EF << /F 4 0 R /UF 4 0 R >> >>'
+		for objects in ([(1,b'<< /Type /Catalog >>'),(3,filespec),(4,makestream(b'x=eval(y)'))],
+			[(4,makestream(b'x=eval(y)')),(3,filespec),(1,b'<< /Type /Catalog >>')]):
+			for singlepass in (False,True):
+				threats=pdfaudit.Auditor(singlepass=singlepass,signatures=[('eval','eval(')]).audit(makepdf(objects)).threats
+				self.assertEqual([(i[0],i[1]) for i in threats],[('Signature',(4,0))])
+
+	def test_malformed(self):
+		# malformed input is reported as PDFSyntaxError, with the findings so far
+		for body in (b'<< /S /JavaScript /JS (unterminated',b'<< [1 2] /Key >>',b'<< /J#zz 1 >>'):
+			with self.assertRaises(pdfaudit.PDFSyntaxError) as context:
+				pdfaudit.Auditor().audit(makepdf([(1,b'<< /Type /Catalog /OpenAction 2 0 R >>'),(2,body)]))
+			self.assertIsNotNone(context.exception.findings)
+
+if __name__ == '__main__':
+	unittest.main()